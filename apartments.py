@@ -0,0 +1,348 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = '.cache'
+
+AMENITY_COLUMNS = ['Allow Pets?', 'Parking?', 'Gymnasium?']
+BOOL_COLUMNS = AMENITY_COLUMNS + ['Available?']
+FLOAT_COLUMNS = ['Cost', 'Latitude', 'Longitude']
+INT_COLUMNS = ['Bedrooms']
+
+TRUE_VALUES = {'yes', 'y', 'true', '1', '1.0'}
+
+GRID_CELL_DEG = 0.005  # ~550 m of latitude
+CLUSTER_PIXELS = 60
+EARTH_RADIUS_M = 6_371_000
+
+PAGE_SIZE = 20
+# a listing at the budget midpoint outweighs one at the middle of the bedroom
+# range, which outweighs one with every amenity
+BUDGET_WEIGHT, BEDROOM_WEIGHT, AMENITY_WEIGHT = 3.0, 2.0, 1.0
+
+
+def source_signature(file_path):
+    # cheap check used before falling back to hashing the whole workbook
+    stat = os.stat(file_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def to_bool(column):
+    if column.dtype == bool:
+        return column
+    return column.map(lambda v: str(v).strip().lower() in TRUE_VALUES if pd.notna(v) else False).astype(bool)
+
+
+def normalize_apartments(df):
+    df = df.copy()
+    for col in FLOAT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    # rows without a cost or bedroom count can never pass the preference filter
+    df = df.dropna(subset=[c for c in ['Cost', 'Bedrooms'] if c in df.columns])
+    for col in INT_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').astype('int64')
+    for col in BOOL_COLUMNS:
+        if col in df.columns:
+            df[col] = to_bool(df[col])
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].astype('string')
+    return df.reset_index(drop=True)
+
+
+def cache_paths(file_path, cache_dir):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    base = os.path.join(cache_dir, name)
+    return base + '.parquet', base + '.meta.json'
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_atomic(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_meta(meta_path, signature, sha256):
+    meta = {'mtime_ns': signature[0], 'size': signature[1], 'sha256': sha256}
+
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(meta, f)
+
+    write_atomic(meta_path, write)
+
+
+def load_apartment_data(file_path, cache_dir=CACHE_DIR):
+    """Load the listing workbook through a typed Parquet cache.
+
+    The workbook is only parsed when its mtime/size and content hash no longer
+    match the cached copy; otherwise the Parquet file is read directly.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    parquet_path, meta_path = cache_paths(file_path, cache_dir)
+    signature = source_signature(file_path)
+    meta = read_meta(meta_path)
+    have_cache = meta is not None and os.path.exists(parquet_path)
+
+    if have_cache and (meta['mtime_ns'], meta['size']) == tuple(signature):
+        return pd.read_parquet(parquet_path)
+
+    sha256 = file_hash(file_path)
+    if have_cache and meta['sha256'] == sha256:
+        # touched but unchanged, remember the new mtime so we skip hashing next time
+        write_meta(meta_path, signature, sha256)
+        return pd.read_parquet(parquet_path)
+
+    df = normalize_apartments(pd.read_excel(file_path))
+    write_atomic(parquet_path, lambda path: df.to_parquet(path, index=False))
+    write_meta(meta_path, signature, sha256)
+    return df
+
+
+def filter_apartments(df, price_range, num_bedrooms, allow_pets, need_parking, need_gym):
+    # reference full-scan filter, kept to check ApartmentIndex against
+    return df[
+        (df['Cost'] >= price_range[0]) &
+        (df['Cost'] <= price_range[1]) &
+        (df['Bedrooms'] >= num_bedrooms[0]) &
+        (df['Bedrooms'] <= num_bedrooms[1]) &
+        (df['Allow Pets?'].astype(bool) == allow_pets if allow_pets else True) &
+        (df['Parking?'].astype(bool) == need_parking if need_parking else True) &
+        (df['Gymnasium?'].astype(bool) == need_gym if need_gym else True)
+    ]
+
+
+class SpatialIndex:
+    """Uniform latitude/longitude grid over the listings with coordinates.
+
+    Rows are sorted by grid cell, so a bounding box costs one binary search
+    per grid column plus an exact check of the rows in the cells it covers.
+    """
+
+    def __init__(self, lat, lon, cell_deg=GRID_CELL_DEG):
+        self.lat = np.asarray(lat, dtype='float64')
+        self.lon = np.asarray(lon, dtype='float64')
+        self.cell_deg = cell_deg
+        valid = np.flatnonzero(np.isfinite(self.lat) & np.isfinite(self.lon))
+        if len(valid):
+            self.lat0, self.lon0 = self.lat[valid].min(), self.lon[valid].min()
+            self.mid_lat = (self.lat0 + self.lat[valid].max()) / 2
+        else:
+            self.lat0 = self.lon0 = self.mid_lat = 0.0
+        cx = self.cell_x(self.lon[valid])
+        cy = self.cell_y(self.lat[valid])
+        self.nx = int(cx.max()) + 1 if len(valid) else 0
+        self.ny = int(cy.max()) + 1 if len(valid) else 0
+        keys = cx * self.ny + cy
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.order = valid[order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def cell_x(self, lon):
+        return np.floor((np.asarray(lon) - self.lon0) / self.cell_deg).astype(np.int64)
+
+    def cell_y(self, lat):
+        return np.floor((np.asarray(lat) - self.lat0) / self.cell_deg).astype(np.int64)
+
+    def within(self, candidates, rows):
+        # keep the candidates that are also in ``rows`` (e.g. a filter result)
+        if rows is None:
+            return candidates
+        member = np.zeros(len(self.lat), dtype=bool)
+        member[rows] = True
+        return candidates[member[candidates]]
+
+    def bbox_rows(self, south, west, north, east, rows=None):
+        """Sorted rows inside the box, optionally restricted to ``rows``."""
+        x0, x1 = max(int(self.cell_x(west)), 0), min(int(self.cell_x(east)), self.nx - 1)
+        y0, y1 = max(int(self.cell_y(south)), 0), min(int(self.cell_y(north)), self.ny - 1)
+        if x0 > x1 or y0 > y1:
+            return np.empty(0, dtype=np.intp)
+        columns = np.arange(x0, x1 + 1) * self.ny
+        starts = np.searchsorted(self.keys, columns + y0, side='left')
+        stops = np.searchsorted(self.keys, columns + y1, side='right')
+        candidates = np.concatenate([self.order[start:stop] for start, stop in zip(starts, stops)])
+        lat, lon = self.lat[candidates], self.lon[candidates]
+        candidates = candidates[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+        return np.sort(self.within(candidates, rows))
+
+    def radius_rows(self, lat, lon, radius_m, rows=None):
+        """Sorted rows within ``radius_m`` metres (great-circle) of a point."""
+        angle = radius_m / EARTH_RADIUS_M
+        dlat = np.degrees(angle)
+        # the circle is widest north or south of the centre, so this is a bit more than dlat / cos(lat)
+        width = np.sin(min(angle, np.pi / 2)) / max(np.cos(np.radians(lat)), 1e-12)
+        dlon = np.degrees(np.arcsin(width)) if width < 1 else 180.0
+        candidates = self.bbox_rows(lat - dlat, lon - dlon, lat + dlat, lon + dlon, rows)
+        return candidates[haversine_m(lat, lon, self.lat[candidates], self.lon[candidates]) <= radius_m]
+
+    def cluster_labels(self, rows, zoom, pixels=CLUSTER_PIXELS):
+        """Group ``rows`` into screen cells about ``pixels`` wide at map ``zoom``.
+
+        Returns (rows with coordinates, cluster label per row, cluster count).
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        rows = rows[np.isfinite(self.lat[rows]) & np.isfinite(self.lon[rows])]
+        # a 256 px Web Mercator tile spans 360 / 2**zoom degrees of longitude
+        lon_deg = 360 / 2 ** zoom * pixels / 256
+        lat_deg = lon_deg * np.cos(np.radians(self.mid_lat))
+        cells = np.floor(self.lon[rows] / lon_deg).astype(np.int64) * (1 << 32) + np.floor(self.lat[rows] / lat_deg).astype(np.int64)
+        _, labels = np.unique(cells, return_inverse=True)
+        return rows, labels, int(labels.max()) + 1 if len(labels) else 0
+
+
+def haversine_m(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def closeness(values, value_range):
+    """1 at the middle of ``value_range``, falling linearly to 0 at its ends."""
+    middle = (value_range[0] + value_range[1]) / 2
+    half_width = max((value_range[1] - value_range[0]) / 2, 0.5)
+    return np.clip(1 - np.abs(values - middle) / half_width, 0, 1)
+
+
+class RankedApartments:
+    """A filter result in rank order; a page is a slice, nothing is re-sorted."""
+
+    def __init__(self, df, rows):
+        self.df = df
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def page_count(self, page_size=PAGE_SIZE):
+        return max(1, -(-len(self.rows) // page_size))
+
+    def page(self, number, page_size=PAGE_SIZE):
+        """Listings on zero-based page ``number``."""
+        return self.df.iloc[self.rows[number * page_size:(number + 1) * page_size]]
+
+
+class ApartmentIndex:
+    """Sorted Cost/Bedrooms arrays plus an amenity bitmask per listing.
+
+    Range predicates are answered with binary search on the sorted arrays and
+    amenity predicates with a single AND against the bitmask, so a query only
+    touches the rows inside the narrower of the two ranges.
+    """
+
+    PETS, PARKING, GYM = 1, 2, 4
+
+    def __init__(self, df):
+        self.df = df
+        n = len(df)
+        self.cost = df['Cost'].to_numpy(dtype='float64') if 'Cost' in df else np.empty(0)
+        self.bedrooms = df['Bedrooms'].to_numpy(dtype='float64') if 'Bedrooms' in df else np.empty(0)
+        self.cost_order = np.argsort(self.cost, kind='stable')
+        self.cost_sorted = self.cost[self.cost_order]
+        self.bedroom_order = np.argsort(self.bedrooms, kind='stable')
+        self.bedrooms_sorted = self.bedrooms[self.bedroom_order]
+
+        self.amenities = np.zeros(n, dtype=np.uint8)
+        for bit, col in zip((self.PETS, self.PARKING, self.GYM), AMENITY_COLUMNS):
+            if col in df:
+                self.amenities[df[col].astype(bool).to_numpy()] |= bit
+        # query-independent part of the rank, computed once per load
+        self.amenity_score = np.array([bin(mask).count('1') / 3 for mask in range(8)])[self.amenities] * AMENITY_WEIGHT
+
+        self.spatial = None
+        if 'Latitude' in df and 'Longitude' in df:
+            self.spatial = SpatialIndex(df['Latitude'].to_numpy(dtype='float64', na_value=np.nan), df['Longitude'].to_numpy(dtype='float64', na_value=np.nan))
+
+    def __len__(self):
+        return len(self.df)
+
+    def range_rows(self, order, sorted_values, low, high):
+        start = np.searchsorted(sorted_values, low, side='left')
+        stop = np.searchsorted(sorted_values, high, side='right')
+        return order[start:stop]
+
+    def query_rows(self, price_range, num_bedrooms, allow_pets=False, need_parking=False, need_gym=False):
+        if len(self) == 0:
+            return np.empty(0, dtype=np.intp)
+        by_cost = self.range_rows(self.cost_order, self.cost_sorted, *price_range)
+        by_bedrooms = self.range_rows(self.bedroom_order, self.bedrooms_sorted, *num_bedrooms)
+
+        # walk the smaller slice and check the other range by direct lookup
+        if len(by_cost) <= len(by_bedrooms):
+            rows = by_cost
+            beds = self.bedrooms[rows]
+            rows = rows[(beds >= num_bedrooms[0]) & (beds <= num_bedrooms[1])]
+        else:
+            rows = by_bedrooms
+            cost = self.cost[rows]
+            rows = rows[(cost >= price_range[0]) & (cost <= price_range[1])]
+
+        required = (self.PETS if allow_pets else 0) | (self.PARKING if need_parking else 0) | (self.GYM if need_gym else 0)
+        if required:
+            rows = rows[(self.amenities[rows] & required) == required]
+        return np.sort(rows)
+
+    def query(self, price_range, num_bedrooms, allow_pets=False, need_parking=False, need_gym=False):
+        rows = self.query_rows(price_range, num_bedrooms, allow_pets, need_parking, need_gym)
+        return self.df.iloc[rows]
+
+    def rank(self, price_range, num_bedrooms, allow_pets=False, need_parking=False, need_gym=False):
+        """Same rows as query_rows(), best first: budget midpoint, then bedroom fit, then amenities."""
+        rows = self.query_rows(price_range, num_bedrooms, allow_pets, need_parking, need_gym)
+        score = (
+            closeness(self.cost[rows], price_range) * BUDGET_WEIGHT
+            + closeness(self.bedrooms[rows], num_bedrooms) * BEDROOM_WEIGHT
+            + self.amenity_score[rows]
+        )
+        # stable, so equal scores keep sheet order
+        return RankedApartments(self.df, rows[np.argsort(-score, kind='stable')])
+
+    def map_clusters(self, rows, zoom, bounds=None):
+        """Per-cluster centre, listing count, price range and pixel radius for the map.
+
+        ``bounds`` is an optional (south, west, north, east) viewport.
+        """
+        columns = ['latitude', 'longitude', 'count', 'min_cost', 'max_cost', 'radius']
+        if self.spatial is None:
+            return pd.DataFrame(columns=columns)
+        if bounds is not None:
+            rows = self.spatial.bbox_rows(*bounds, rows=rows)
+        rows, labels, n = self.spatial.cluster_labels(rows, zoom)
+        count = np.bincount(labels, minlength=n)
+        cost = self.cost[rows]
+        min_cost = np.full(n, np.inf)
+        np.minimum.at(min_cost, labels, cost)
+        max_cost = np.full(n, -np.inf)
+        np.maximum.at(max_cost, labels, cost)
+        return pd.DataFrame({
+            'latitude': np.bincount(labels, self.spatial.lat[rows], n) / np.maximum(count, 1),
+            'longitude': np.bincount(labels, self.spatial.lon[rows], n) / np.maximum(count, 1),
+            'count': count,
+            'min_cost': min_cost,
+            'max_cost': max_cost,
+            'radius': np.minimum(6 + 3 * np.sqrt(count), CLUSTER_PIXELS / 2),
+        }, columns=columns)
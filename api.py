@@ -0,0 +1,210 @@
+"""HTTP/JSON front end for service.LeasyService.
+
+    python api.py [--host 127.0.0.1] [--port 8000] [--workers 4]
+
+Handlers are async and hand blocking work to the thread pool. Every worker
+process has its own LeasyService; profiles are shared through users.sqlite.
+Gemini calls use the key from the X-Gemini-Key header, and the two
+streaming endpoints send plain text as it is generated. Chat log uploads
+are written to disk as they arrive rather than read into memory first.
+
+Routes that write need the shared service token from LEASY_API_TOKEN in
+the X-Leasy-Token header. Changes to one user's profile or chat log are
+also accepted with that user's password in X-Leasy-Password. Without a
+configured token, sign-ups and bare chat log uploads are refused.
+"""
+import argparse
+import hmac
+import os
+
+from anyio import from_thread
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+import chat_history
+import chat_logs
+from service import LeasyService, MissingStyleData
+
+API_KEY_HEADER = 'X-Gemini-Key'
+TOKEN_HEADER = 'X-Leasy-Token'
+PASSWORD_HEADER = 'X-Leasy-Password'
+TOKEN_ENV = 'LEASY_API_TOKEN'
+SEARCH_FIELDS = ['price_range', 'num_bedrooms', 'allow_pets', 'need_parking', 'need_gym', 'page', 'page_size', 'zoom', 'bounds']
+
+
+def error(status, message):
+    return JSONResponse({'error': message}, status_code=status)
+
+
+def body_chunks(request):
+    """The request body for a worker thread, pulled from the event loop a chunk at a time."""
+    stream = request.stream()
+
+    async def next_chunk():
+        return await stream.__anext__()
+
+    while True:
+        try:
+            yield from_thread.run(next_chunk)
+        except StopAsyncIteration:
+            return
+
+
+def create_app(service, token=None):
+    """``token`` is the shared service token; None accepts only user passwords."""
+    def has_token(request):
+        sent = request.headers.get(TOKEN_HEADER)
+        return token is not None and sent is not None and hmac.compare_digest(sent.encode('utf-8'), token.encode('utf-8'))
+
+    async def authorized(request, username=None):
+        # the service token, or for a route about one user, that user's password
+        if has_token(request):
+            return True
+        password = request.headers.get(PASSWORD_HEADER)
+        return username is not None and password is not None and await run_in_threadpool(service.login, username, password)
+
+    async def health(request):
+        return JSONResponse({'ok': True})
+
+    async def login(request):
+        body = await request.json()
+        ok = await run_in_threadpool(service.login, body.get('username'), body.get('password'))
+        return JSONResponse({'ok': ok})
+
+    async def get_user(request):
+        profile = await run_in_threadpool(service.get_user, request.path_params['username'])
+        return JSONResponse(profile) if profile is not None else error(404, "no such user")
+
+    async def create_user(request):
+        if not has_token(request):
+            return error(401, "a service token is required")
+        body = await request.json()
+        try:
+            created = await run_in_threadpool(service.create_user, request.path_params['username'], body)
+        except ValueError as e:
+            return error(400, str(e))
+        return JSONResponse({'created': True}, status_code=201) if created else error(409, "username already exists")
+
+    async def update_user(request):
+        if not await authorized(request, request.path_params['username']):
+            return error(401, "a service token or the user's password is required")
+        changes = await request.json()
+        changes.pop('password', None)
+        profile = await run_in_threadpool(service.update_user, request.path_params['username'], changes)
+        return JSONResponse(profile) if profile is not None else error(404, "no such user")
+
+    def declared_too_large(request):
+        # refuse before reading anything if the client says up front
+        length = request.headers.get('content-length')
+        return length is not None and length.isdigit() and int(length) > service.chat_logs.max_bytes
+
+    async def store_chat_log(request):
+        if not has_token(request):
+            return error(401, "a service token is required")
+        if declared_too_large(request):
+            return error(413, str(chat_logs.too_large(service.chat_logs.max_bytes)))
+        try:
+            digest = await run_in_threadpool(service.store_chat_log, body_chunks(request))
+        except chat_logs.UploadTooLarge as e:
+            return error(413, str(e))
+        return JSONResponse({'digest': digest}, status_code=201)
+
+    async def save_chat_log(request):
+        username = request.path_params['username']
+        if not await authorized(request, username):
+            return error(401, "a service token or the user's password is required")
+        if await run_in_threadpool(service.get_user, username) is None:
+            return error(404, "no such user")
+        if declared_too_large(request):
+            return error(413, str(chat_logs.too_large(service.chat_logs.max_bytes)))
+        try:
+            digest = await run_in_threadpool(service.save_chat_log, username, body_chunks(request))
+        except chat_logs.UploadTooLarge as e:
+            return error(413, str(e))
+        return JSONResponse({'digest': digest}) if digest is not None else error(404, "no such user")
+
+    async def style_sample(request):
+        sample = await run_in_threadpool(service.style_sample, request.path_params['username'])
+        return JSONResponse({'sample': sample})
+
+    async def profile_text(request):
+        text = await run_in_threadpool(service.profile_text, request.path_params['username'], request.query_params.get('label', "User A"))
+        return JSONResponse({'text': text}) if text is not None else error(404, "no such user")
+
+    async def roommate_matches(request):
+        matches = await run_in_threadpool(service.roommate_matches, request.path_params['username'])
+        return JSONResponse({'matches': matches})
+
+    async def search_apartments(request):
+        body = await request.json()
+        try:
+            result = await run_in_threadpool(service.search_apartments, **{field: body[field] for field in SEARCH_FIELDS if field in body})
+        except (TypeError, ValueError) as e:
+            return error(400, str(e))
+        return JSONResponse(result)
+
+    async def conversation_prompt(request):
+        body = await request.json()
+        prompt = await run_in_threadpool(service.conversation_prompt, body['username'], body['match'])
+        return JSONResponse({'prompt': prompt})
+
+    async def stream_conversation(request):
+        body = await request.json()
+        try:
+            chunks = await run_in_threadpool(service.stream_conversation, request.headers.get(API_KEY_HEADER), body['username'], body['match'], {})
+        except MissingStyleData as e:
+            return error(404, str(e))
+        return StreamingResponse(chunks, media_type='text/plain; charset=utf-8')
+
+    async def prefetch_conversations(request):
+        body = await request.json()
+        await run_in_threadpool(service.prefetch_conversations, request.headers.get(API_KEY_HEADER), body['username'], body['matches'])
+        return Response(status_code=202)
+
+    async def stream_support(request):
+        body = await request.json()
+        issue = body.get('issue')
+        if not isinstance(issue, str):
+            return error(400, "issue must be a string")
+        # the history is bounded by the service, one message has to be refused
+        if chat_history.approx_tokens(issue) > chat_history.MAX_TOKENS:
+            return error(413, f"an issue can be at most about {chat_history.MAX_TOKENS} tokens")
+        try:
+            chunks = await run_in_threadpool(service.stream_support, request.headers.get(API_KEY_HEADER), body.get('history', []), issue, {})
+        except (KeyError, TypeError, ValueError) as e:
+            return error(400, f"malformed history: {e}")
+        return StreamingResponse(chunks, media_type='text/plain; charset=utf-8')
+
+    return Starlette(routes=[
+        Route('/health', health),
+        Route('/login', login, methods=['POST']),
+        Route('/users/{username}', get_user, methods=['GET']),
+        Route('/users/{username}', create_user, methods=['POST']),
+        Route('/users/{username}', update_user, methods=['PATCH']),
+        Route('/users/{username}/chat_log', save_chat_log, methods=['PUT']),
+        Route('/chat_logs', store_chat_log, methods=['POST']),
+        Route('/users/{username}/style', style_sample),
+        Route('/users/{username}/profile_text', profile_text),
+        Route('/users/{username}/matches', roommate_matches),
+        Route('/apartments/search', search_apartments, methods=['POST']),
+        Route('/conversations/prompt', conversation_prompt, methods=['POST']),
+        Route('/conversations/stream', stream_conversation, methods=['POST']),
+        Route('/conversations/prefetch', prefetch_conversations, methods=['POST']),
+        Route('/support/stream', stream_support, methods=['POST']),
+    ])
+
+
+app = create_app(LeasyService(), os.environ.get(TOKEN_ENV) or None)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="LeasyBot JSON API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run('api:app', host=args.host, port=args.port, workers=args.workers)
@@ -0,0 +1,126 @@
+"""Client for api.py with the same methods as service.LeasyService."""
+import codecs
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import chat_logs
+from service import MissingStyleData
+
+API_KEY_HEADER = 'X-Gemini-Key'
+TOKEN_HEADER = 'X-Leasy-Token'
+READ_SIZE = 1024
+
+
+class ApiClient:
+    """``token`` is the API's shared service token, sent with every request."""
+
+    def __init__(self, base_url, token=None, timeout=120):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def open(self, method, path, body=None, api_key=None, data=None, content_type='application/json'):
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', content_type)
+        if api_key:
+            request.add_header(API_KEY_HEADER, api_key)
+        if self.token:
+            request.add_header(TOKEN_HEADER, self.token)
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def call(self, method, path, body=None, missing=None, **kwargs):
+        """Decoded JSON reply; a 404 or 409 returns ``missing`` instead of raising."""
+        try:
+            with self.open(method, path, body, **kwargs) as response:
+                payload = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code in (404, 409):
+                return missing
+            if e.code == 413:
+                raise chat_logs.UploadTooLarge(json.loads(e.read()).get('error', "upload too large"))
+            raise
+        return json.loads(payload) if payload else None
+
+    def user_path(self, username, suffix=''):
+        return f"/users/{urllib.parse.quote(username, safe='')}{suffix}"
+
+    def stream(self, path, body, api_key, timings):
+        start = time.perf_counter()
+        try:
+            response = self.open('POST', path, body, api_key)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                raise MissingStyleData(json.loads(e.read()).get('error', "not found"))
+            raise
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        with response:
+            while True:
+                data = response.read1(READ_SIZE)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    timings.setdefault('ttft', time.perf_counter() - start)
+                    yield text
+                if not data:
+                    break
+        timings.setdefault('ttft', time.perf_counter() - start)
+        timings['total'] = time.perf_counter() - start
+
+    def login(self, username, password):
+        return self.call('POST', '/login', {'username': username, 'password': password})['ok']
+
+    def get_user(self, username):
+        return self.call('GET', self.user_path(username))
+
+    def create_user(self, username, user_data):
+        return self.call('POST', self.user_path(username), user_data, missing={}).get('created', False)
+
+    def update_user(self, username, changes):
+        return self.call('PATCH', self.user_path(username), changes)
+
+    def upload(self, method, path, data):
+        # bytes go as they are, files and chunk iterables with chunked encoding
+        if not isinstance(data, (bytes, bytearray)):
+            data = chat_logs.iter_chunks(data)
+        return self.call(method, path, data=data, content_type='text/plain')
+
+    def store_chat_log(self, data):
+        return self.upload('POST', '/chat_logs', data)['digest']
+
+    def save_chat_log(self, username, data):
+        reply = self.upload('PUT', self.user_path(username, '/chat_log'), data)
+        return reply['digest'] if reply is not None else None
+
+    def style_sample(self, username):
+        return self.call('GET', self.user_path(username, '/style'))['sample']
+
+    def profile_text(self, username, label):
+        reply = self.call('GET', self.user_path(username, '/profile_text?' + urllib.parse.urlencode({'label': label})))
+        return reply['text'] if reply is not None else None
+
+    def roommate_matches(self, username):
+        return self.call('GET', self.user_path(username, '/matches'))['matches']
+
+    def search_apartments(self, price_range, num_bedrooms, allow_pets=False, need_parking=False, need_gym=False, page=1, page_size=None, zoom=None, bounds=None):
+        body = {'price_range': list(price_range), 'num_bedrooms': list(num_bedrooms), 'allow_pets': allow_pets, 'need_parking': need_parking, 'need_gym': need_gym, 'page': page}
+        for field, value in (('page_size', page_size), ('zoom', zoom), ('bounds', bounds)):
+            if value is not None:
+                body[field] = value
+        return self.call('POST', '/apartments/search', body)
+
+    def conversation_prompt(self, username, match):
+        return self.call('POST', '/conversations/prompt', {'username': username, 'match': match})['prompt']
+
+    def stream_conversation(self, api_key, username, match, timings):
+        return self.stream('/conversations/stream', {'username': username, 'match': match}, api_key, timings)
+
+    def prefetch_conversations(self, api_key, username, matches):
+        self.call('POST', '/conversations/prefetch', {'username': username, 'matches': matches}, api_key=api_key)
+
+    def stream_support(self, api_key, history, issue, timings):
+        return self.stream('/support/stream', {'history': history, 'issue': issue}, api_key, timings)
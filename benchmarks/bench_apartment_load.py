@@ -0,0 +1,42 @@
+"""Cold vs warm load of the apartment workbook.
+
+    python -m benchmarks.bench_apartment_load [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import apartments
+from benchmarks.synthetic import make_apartments
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        xlsx = os.path.join(tmp, 'Apartment_DB.xlsx')
+        cache_dir = os.path.join(tmp, 'cache')
+        make_apartments(n).to_excel(xlsx, index=False)
+
+        _, read_excel = timed(lambda: pd.read_excel(xlsx))
+        _, cold = timed(lambda: apartments.load_apartment_data(xlsx, cache_dir))
+        df, warm = timed(lambda: apartments.load_apartment_data(xlsx, cache_dir))
+        os.utime(xlsx)
+        _, touched = timed(lambda: apartments.load_apartment_data(xlsx, cache_dir))
+        assert len(df) == n
+    print(f"{n:>9} rows | read_excel {read_excel:8.3f}s | cold {cold:8.3f}s | warm {warm:8.4f}s | touched {touched:8.4f}s")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
@@ -0,0 +1,50 @@
+"""ApartmentIndex vs the full-scan mask, timing only.
+
+    python -m benchmarks.bench_apartment_query [rows ...]
+
+That both return the same rows is checked in tests/test_apartment_index.py.
+"""
+import sys
+import time
+
+import numpy as np
+
+import apartments
+from benchmarks.synthetic import make_apartments
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+QUERIES = 200
+
+
+def random_queries(rng, count):
+    for _ in range(count):
+        low, high = sorted(rng.integers(500, 3001, 2))
+        beds = sorted(rng.integers(1, 7, 2))
+        allow_pets, need_parking, need_gym = (rng.random(3) < 0.5).tolist()
+        yield (low, high), beds, allow_pets, need_parking, need_gym
+
+
+def run(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = apartments.normalize_apartments(make_apartments(n, seed))
+
+    start = time.perf_counter()
+    index = apartments.ApartmentIndex(df)
+    build = time.perf_counter() - start
+
+    queries = list(random_queries(rng, QUERIES))
+    scan_time = index_time = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        apartments.filter_apartments(df, *query)
+        scan_time += time.perf_counter() - start
+        start = time.perf_counter()
+        index.query(*query)
+        index_time += time.perf_counter() - start
+    print(f"{n:>9} rows | build {build:7.3f}s | scan {scan_time / QUERIES * 1e3:8.3f} ms/q | index {index_time / QUERIES * 1e3:8.3f} ms/q")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
@@ -0,0 +1,50 @@
+"""Ranked, paginated results vs the filter, timing only.
+
+    python -m benchmarks.bench_apartment_rank [rows ...]
+
+Compares rendering the whole filtered frame with ranking once and fetching
+pages. That the ranked rows are exactly the filtered rows is checked in
+tests/test_apartment_rank.py.
+"""
+import sys
+import time
+
+import numpy as np
+
+import apartments
+from benchmarks.bench_apartment_query import random_queries
+from benchmarks.synthetic import make_apartments
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+QUERIES = 100
+PAGES = 5
+
+
+def run(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = apartments.normalize_apartments(make_apartments(n, seed))
+    index = apartments.ApartmentIndex(df)
+
+    filter_time = rank_time = page_time = 0.0
+    for query in random_queries(rng, QUERIES):
+        start = time.perf_counter()
+        apartments.filter_apartments(df, *query)
+        filter_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        ranked = index.rank(*query)
+        rank_time += time.perf_counter() - start
+        start = time.perf_counter()
+        for number in range(min(PAGES, ranked.page_count())):
+            ranked.page(number)
+        page_time += time.perf_counter() - start
+    print(
+        f"{n:>9} rows | filter {filter_time / QUERIES * 1e3:8.3f} ms/q | rank {rank_time / QUERIES * 1e3:8.3f} ms/q | "
+        f"page {page_time / QUERIES / PAGES * 1e3:7.3f} ms/page"
+    )
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
@@ -0,0 +1,179 @@
+"""Load test of api.py on synthetic data with a stub Gemini model.
+
+    python -m benchmarks.bench_api [--workers 1 4] [--clients 16] [--seconds 10] [--users N] [--apartments N]
+
+For each worker count, serves a scratch dataset with
+``uvicorn benchmarks.bench_api:app --workers N`` and drives it from
+``--clients`` keep-alive connections with a mix of searches, match lookups,
+profile reads and writes, and streamed conversations. Reports requests per
+second and latency percentiles per endpoint.
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+
+import api
+import metrics
+from benchmarks.synthetic import write_dataset
+from fake_llm import FakeGenerativeModel
+from service import LeasyService
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LLM_DELAY_ENV = 'LEASY_BENCH_LLM_DELAY'
+TOKEN = 'benchmark'
+# (operation, share of requests)
+MIX = [('search', 0.40), ('matches', 0.20), ('get_user', 0.15), ('update_user', 0.05), ('conversation', 0.10), ('support', 0.10)]
+
+
+def stub_model(api_key):
+    delay = float(os.environ.get(LLM_DELAY_ENV, '0.05'))
+    return FakeGenerativeModel('models/fake-gemini-pro', first_chunk_delay=delay, chunk_delay=delay / 10)
+
+
+# what each uvicorn worker serves; the stub has no quota to protect
+app = api.create_app(LeasyService(make_model=stub_model, llm_requests_per_minute=None), TOKEN)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(data_dir, port, workers, llm_delay):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONWARNINGS='ignore', **{LLM_DELAY_ENV: str(llm_delay)})
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'benchmarks.bench_api:app', '--port', str(port), '--workers', str(workers), '--log-level', 'warning', '--no-access-log'],
+        cwd=data_dir, env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("API server did not start")
+
+
+class Client:
+    """One keep-alive connection issuing random requests from MIX."""
+
+    def __init__(self, port, users, with_logs, seed):
+        self.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        self.users = users
+        self.with_logs = with_logs
+        self.rng = np.random.default_rng(seed)
+        self.operations = [name for name, _ in MIX]
+        self.weights = [share for _, share in MIX]
+
+    def request(self, method, path, body=None):
+        headers = {api.API_KEY_HEADER: 'benchmark', api.TOKEN_HEADER: TOKEN}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+        self.conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = self.conn.getresponse()
+        response.read()
+        return response.status
+
+    def one(self):
+        operation = self.operations[self.rng.choice(len(self.operations), p=self.weights)]
+        username = self.users[self.rng.integers(len(self.users))]
+        if operation == 'search':
+            low = int(self.rng.integers(500, 2500))
+            beds = int(self.rng.integers(1, 6))
+            status = self.request('POST', '/apartments/search', {
+                'price_range': [low, low + int(self.rng.integers(100, 1000))], 'num_bedrooms': [beds, beds + 1],
+                'allow_pets': bool(self.rng.random() < 0.3), 'page': int(self.rng.integers(1, 4)),
+            })
+        elif operation == 'matches':
+            status = self.request('GET', f"/users/{username}/matches")
+        elif operation == 'get_user':
+            status = self.request('GET', f"/users/{username}")
+        elif operation == 'update_user':
+            status = self.request('PATCH', f"/users/{username}", {'age': int(self.rng.integers(18, 30))})
+        elif operation == 'conversation':
+            a, b = self.rng.choice(self.with_logs, 2, replace=False)
+            status = self.request('POST', '/conversations/stream', {'username': str(a), 'match': str(b)})
+        else:
+            status = self.request('POST', '/support/stream', {'history': [], 'issue': f"Issue {self.rng.integers(1000)}: I can't see my matches."})
+        return operation, status
+
+
+def drive(port, users, with_logs, clients, seconds):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def worker(seed):
+        client = Client(port, users, with_logs, seed)
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            operation, status = client.one()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[operation].append(elapsed)
+                if status >= 400:
+                    errors[operation] += 1
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - start
+
+
+def run(workers, clients, seconds, warmup, data_dir, users, with_logs, llm_delay):
+    port = free_port()
+    server = start_server(data_dir, port, workers, llm_delay)
+    try:
+        # every worker builds its apartment index and match table on first use
+        drive(port, users, with_logs, clients, warmup)
+        latencies, errors, wall = drive(port, users, with_logs, clients, seconds)
+    finally:
+        server.terminate()
+        server.wait()
+    total = sum(len(values) for values in latencies.values())
+    print(f"{workers} worker(s), {clients} clients: {total / wall:8.1f} req/s")
+    for operation, _ in MIX:
+        values = latencies.get(operation, [])
+        print(
+            f"  {operation:<13} {len(values) / wall:8.1f} req/s | p50 {metrics.percentile(values, 0.5) * 1e3:8.2f} ms | "
+            f"p95 {metrics.percentile(values, 0.95) * 1e3:8.2f} ms | p99 {metrics.percentile(values, 0.99) * 1e3:8.2f} ms | errors {errors.get(operation, 0)}"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--users', type=int, default=5_000)
+    parser.add_argument('--apartments', type=int, default=5_000)
+    parser.add_argument('--chat-logs', type=int, default=100)
+    parser.add_argument('--llm-delay', type=float, default=0.05, help="stub model delay before the first chunk, in seconds")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        users, _ = write_dataset(data_dir, args.users, args.apartments, args.chat_logs, xlsx=True)
+        usernames = list(users)
+        with_logs = usernames[:args.chat_logs]
+        for workers in args.workers:
+            run(workers, args.clients, args.seconds, args.warmup, data_dir, usernames, with_logs, args.llm_delay)
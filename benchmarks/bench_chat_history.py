@@ -0,0 +1,34 @@
+"""Request size and memory of the tech-support history over a long session.
+
+    python -m benchmarks.bench_chat_history [turns]
+
+The per-turn token ceiling is checked in tests/test_chat_history.py.
+"""
+import sys
+
+import chat_history
+import fake_llm
+from benchmarks.synthetic import CHAT_PHRASES
+
+DEFAULT_TURNS = 500
+
+
+def run(turns):
+    model = fake_llm.FakeGenerativeModel()
+    history = chat_history.ChatHistory()
+    unbounded = []
+    for turn in range(turns):
+        issue = f"Issue {turn}: {CHAT_PHRASES[turn % len(CHAT_PHRASES)]}. " * (1 + turn % 5)
+        chat = model.start_chat(history=history.to_history())
+        reply = chat.send_message(issue).text
+        history.add("user", issue)
+        history.add("model", reply)
+        unbounded += [issue, reply]
+        if turn in (0, 9, 49, 99, 249) or turn == turns - 1:
+            raw_tokens = sum(chat_history.approx_tokens(text) for text in unbounded)
+            print(f"turn {turn + 1:>4} | request {model.prompt_sizes[-1]:>6} chars | history {history.tokens():>5} tok "
+                  f"(unbounded {raw_tokens:>6} tok) | footprint {history.footprint() / 1024:6.1f} KiB")
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_TURNS)
@@ -0,0 +1,158 @@
+"""Chat log uploads: whole-file writes vs chunked, content-addressed storage.
+
+    python -m benchmarks.bench_chat_logs [--sizes-mb 1 8 32] [--signups 400] [--threads 16] [--distinct 20]
+
+Uploads: peak Python memory (tracemalloc) and time to store one log of
+each size, joined into one bytes object and written as the old sign-up
+path did vs streamed through ChatLogStore. Reads: the old full read and
+decode per access vs the cached view. Sign-ups: threads creating accounts
+through LeasyService with uploads drawn from a few distinct files,
+reporting sign-ups per second, latency and what ends up on disk. Both
+kinds of sign-up build the user's style sample, as the app does.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import chat_samples
+import metrics
+from benchmarks.synthetic import make_chat_log, make_users
+from chat_logs import CHUNK_SIZE, ChatLogStore
+from service import CHAT_LOG_FIELD, LeasyService
+
+MB = 1024 * 1024
+READS = 20
+
+
+def make_log(size, seed=0):
+    block = make_chat_log(['User', 'Chris'], 2_000, seed).encode('utf-8')
+    return (block * (size // len(block) + 1))[:size]
+
+
+def chunks(data):
+    # what a request body or uploaded file hands over, without copying ``data``
+    view = memoryview(data)
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield view[start:start + CHUNK_SIZE]
+
+
+def write_whole(path, data):
+    body = b''.join(chunks(data))
+    with open(path, 'wb') as f:
+        f.write(body)
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def read_whole(path):
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def per_read(fn):
+    start = time.perf_counter()
+    for _ in range(READS):
+        fn()
+    return (time.perf_counter() - start) / READS
+
+
+def bench_upload(size_mb):
+    data = make_log(size_mb * MB)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ChatLogStore(tmp, max_bytes=len(data), cache_chars=len(data))
+        path = os.path.join(tmp, 'user.txt')
+        _, whole_time, whole_peak = measure(lambda: write_whole(path, data))
+        digest, put_time, put_peak = measure(lambda: store.put(chunks(data)))
+
+        whole_read = per_read(lambda: read_whole(path))
+        store.text(digest)
+        cached_read = per_read(lambda: store.text(digest))
+    print(
+        f"{size_mb:>4} MB | upload whole {whole_time * 1e3:7.1f} ms, peak {whole_peak / MB:6.1f} MB | "
+        f"chunked {put_time * 1e3:7.1f} ms, peak {put_peak / MB:6.2f} MB | "
+        f"read {whole_read * 1e3:7.2f} ms vs cached {cached_read * 1e6:6.2f} us"
+    )
+
+
+def bench_signups(n_signups, threads, distinct, size_kb, content_addressed):
+    logs = [make_log(size_kb * 1024, seed) for seed in range(distinct)]
+    profiles = make_users(n_signups, seed=1)
+    usernames = list(profiles)
+    latencies = []
+    lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        service = LeasyService(
+            users_db=os.path.join(tmp, 'users.sqlite'), users_file=os.path.join(tmp, 'users.json'),
+            txt_dir=os.path.join(tmp, 'txt'), styles_dir=os.path.join(tmp, 'styles'), matches_db=os.path.join(tmp, 'matches.sqlite'),
+        )
+        os.makedirs(service.txt_dir, exist_ok=True)
+
+        def sign_up(i):
+            username = usernames[i]
+            user_data = dict(profiles[username])
+            data = logs[i % distinct]
+            start = time.perf_counter()
+            if content_addressed:
+                # create_user builds the style sample from the stored log
+                user_data[CHAT_LOG_FIELD] = service.store_chat_log(chunks(data))
+                service.create_user(username, user_data)
+            else:
+                service.create_user(username, user_data)
+                path = os.path.join(service.txt_dir, f"{username}.txt")
+                write_whole(path, data)
+                chat_samples.save_style_sample(path, username, user_data['full_name'], styles_dir=service.styles_dir)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+        def worker(offset):
+            for i in range(offset, n_signups, threads):
+                sign_up(i)
+
+        # the match table and store exist before the clock starts
+        service.roommate_matches(usernames[0])
+        workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        wall = time.perf_counter() - start
+
+        files = [os.path.join(root, name) for root, _, names in os.walk(service.txt_dir) for name in names]
+        on_disk = sum(os.path.getsize(path) for path in files)
+    uploaded = sum(len(logs[i % distinct]) for i in range(n_signups))
+    label = 'content-addressed' if content_addressed else 'one file per user'
+    print(
+        f"  {label:<17} | {n_signups / wall:7.1f} sign-ups/s | p50 {metrics.percentile(latencies, 0.5) * 1e3:7.2f} ms | "
+        f"p95 {metrics.percentile(latencies, 0.95) * 1e3:7.2f} ms | {len(files):>5} files, "
+        f"{on_disk / MB:7.1f} MB on disk for {uploaded / MB:7.1f} MB uploaded"
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--signups', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--distinct', type=int, default=20, help="distinct chat logs among the sign-ups")
+    parser.add_argument('--log-kb', type=int, default=512, help="size of each sign-up's chat log")
+    args = parser.parse_args()
+
+    for size_mb in args.sizes_mb:
+        bench_upload(size_mb)
+    print(f"{args.signups} sign-ups from {args.threads} threads, {args.distinct} distinct {args.log_kb} KB logs")
+    for content_addressed in (False, True):
+        bench_signups(args.signups, args.threads, args.distinct, args.log_kb, content_addressed)
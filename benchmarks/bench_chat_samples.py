@@ -0,0 +1,60 @@
+"""Prompt size and (fake) generation latency with raw chat logs vs style samples.
+
+    python -m benchmarks.bench_chat_samples [messages per log ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import chat_samples
+import fake_llm
+from benchmarks.synthetic import make_chat_log, make_users
+from prompts import build_conversation_prompt, format_profile
+
+DEFAULT_SIZES = [20, 1_000, 20_000, 100_000]
+# fake prefill cost: 2 ms per 1,000 prompt characters
+PROMPT_DELAY = 0.002
+
+
+def run(n_messages):
+    users = make_users(2, seed=n_messages)
+    model = fake_llm.FakeGenerativeModel(prompt_delay=PROMPT_DELAY)
+    logs = {
+        'user0': make_chat_log(['User', 'Chris'], n_messages, seed=1),
+        'user1': make_chat_log(['User', 'Jess'], n_messages, seed=2),
+    }
+    infos = [format_profile(users['user0'], "User A"), format_profile(users['user1'], "User B")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = {}
+        start = time.perf_counter()
+        for username, text in logs.items():
+            path = os.path.join(tmp, f"{username}.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            samples[username] = chat_samples.save_style_sample(path, username, users[username]['full_name'], styles_dir=tmp)
+        preprocess = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for username in logs:
+            chat_samples.load_style_sample(os.path.join(tmp, f"{username}.txt"), username, styles_dir=tmp)
+        load = (time.perf_counter() - start) / len(logs)
+
+    results = {}
+    for label, texts in (('raw', logs), ('sample', samples)):
+        prompt = build_conversation_prompt(texts['user0'], infos[0], texts['user1'], infos[1])
+        start = time.perf_counter()
+        model.generate_content(prompt)
+        results[label] = (len(prompt), chat_samples.approx_tokens(prompt), time.perf_counter() - start)
+
+    raw, sample = results['raw'], results['sample']
+    print(f"{n_messages:>7} msgs/log | raw prompt {raw[1]:>9} tok, {raw[2] * 1e3:8.1f} ms | "
+          f"sample prompt {sample[1]:>5} tok, {sample[2] * 1e3:6.1f} ms | "
+          f"preprocess {preprocess * 1e3:7.1f} ms | cached load {load * 1e3:5.2f} ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
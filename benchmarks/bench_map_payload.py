@@ -0,0 +1,58 @@
+"""Map payload: every filtered listing as a point vs server-side clusters.
+
+    python -m benchmarks.bench_map_payload [listings ...]
+
+Reports the pydeck JSON size the browser receives and the server time to
+prepare and serialize it. Client-side render time grows with the number of
+features in the payload, which is also reported.
+"""
+import sys
+import time
+
+import pydeck as pdk
+
+import apartments
+from benchmarks.synthetic import make_apartments
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+ZOOM = 12
+
+
+def deck_json(data, view_state, **layer_args):
+    layer = pdk.Layer('ScatterplotLayer', data=data, get_position='[longitude, latitude]', get_color='[200, 30, 0, 160]', pickable=True, **layer_args)
+    return pdk.Deck(layers=[layer], initial_view_state=view_state).to_json()
+
+
+def points_payload(filtered):
+    # the map path before clustering: copy, rename and cast every filtered row
+    map_data = filtered[['Latitude', 'Longitude']].dropna()
+    map_data = map_data.rename(columns={'Latitude': 'latitude', 'Longitude': 'longitude'})
+    map_data = map_data.astype({'latitude': 'float', 'longitude': 'float'})
+    view_state = pdk.ViewState(latitude=map_data['latitude'].mean(), longitude=map_data['longitude'].mean(), zoom=ZOOM)
+    return len(map_data), deck_json(map_data, view_state, get_radius=50)
+
+
+def cluster_payload(index, rows):
+    clusters = index.map_clusters(rows, ZOOM)
+    view_state = pdk.ViewState(latitude=clusters['latitude'].mean(), longitude=clusters['longitude'].mean(), zoom=ZOOM)
+    return len(clusters), deck_json(clusters, view_state, get_radius='radius', radius_units='pixels')
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    features, payload = fn(*args)
+    return features, len(payload.encode('utf-8')), time.perf_counter() - start
+
+
+def run(n, seed=0):
+    index = apartments.ApartmentIndex(apartments.normalize_apartments(make_apartments(n, seed)))
+    rows = index.query_rows((500, 3200), (1, 6))
+    filtered = index.df.iloc[rows]
+    for name, (features, size, seconds) in [('points', timed(points_payload, filtered)), ('clusters', timed(cluster_payload, index, rows))]:
+        print(f"{n:>9} listings | {name:<8} | {features:>9} features | {size / 1e6:9.3f} MB | {seconds * 1e3:9.1f} ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
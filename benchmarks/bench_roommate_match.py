@@ -0,0 +1,43 @@
+"""RoommateMatcher vs the per-candidate Python loop.
+
+    python -m benchmarks.bench_roommate_match [users ...]
+
+That both give the same matches is checked in tests/test_roommates.py.
+"""
+import sys
+import time
+
+import numpy as np
+
+import roommates
+from benchmarks.synthetic import make_users
+
+DEFAULT_SIZES = [100_000, 1_000_000]
+QUERIES = 20
+TOP_K = 10
+
+
+def run(n, seed=0):
+    rng = np.random.default_rng(seed)
+    users = make_users(n, seed)
+
+    start = time.perf_counter()
+    matcher = roommates.RoommateMatcher(users)
+    build = time.perf_counter() - start
+
+    loop_time = vector_time = 0.0
+    for username in rng.choice(matcher.usernames, QUERIES):
+        username = str(username)
+        start = time.perf_counter()
+        roommates.match_users_loop(users, username)[:TOP_K]
+        loop_time += time.perf_counter() - start
+        start = time.perf_counter()
+        matcher.top_matches(username, users[username], k=TOP_K)
+        vector_time += time.perf_counter() - start
+    print(f"{n:>9} users | build {build:7.3f}s | loop {loop_time / QUERIES * 1e3:9.2f} ms/q | vectorized {vector_time / QUERIES * 1e3:7.2f} ms/q")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
@@ -0,0 +1,130 @@
+"""Cold start and per-rerun cost of demo.py, run headlessly with AppTest.
+
+    python -m benchmarks.bench_startup [reruns]
+
+The app runs in a scratch copy of its data files with Gemini replaced by
+FakeGenerativeModel. Cold start is measured in a fresh interpreter per path.
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILES = ['users.json', 'Apartment_DB.xlsx', 'txt']
+HEAVY_MODULES = ['pandas', 'numpy', 'pydeck', 'google.generativeai']
+PATHS = ['logged_out', 'apartment', 'roommate']
+DEFAULT_RERUNS = 20
+
+
+def scratch_copy(directory):
+    for name in DATA_FILES:
+        source = os.path.join(ROOT, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(directory, name))
+        else:
+            shutil.copy(source, directory)
+
+
+def app_test():
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import fake_llm
+    import gemini
+    gemini.make_model = lambda api_key, model_name=gemini.MODEL_NAME: fake_llm.FakeGenerativeModel('models/fake-' + model_name)
+    # cached resources from a previous scratch directory point at deleted files
+    st.cache_resource.clear()
+    return AppTest.from_file(os.path.join(ROOT, 'demo.py'), default_timeout=120)
+
+
+def log_in(at):
+    with open('users.json') as f:
+        users = json.load(f)
+    at.session_state.username = next(name for name, user in users.items() if user.get('looking_for_roommate') == "Yes")
+    at.session_state.app_key = 'benchmark'
+
+
+def rerun(at, path):
+    """One rerun of ``path``; the first call also sets the session up for it."""
+    if path == 'logged_out':
+        at.run()
+    elif path == 'apartment':
+        at.session_state.conversation_type = 'apartment'
+        submit = [button for button in at.button if button.label == "Submit Preferences"]
+        if submit:
+            submit[0].click().run()
+        else:
+            at.run()
+    else:
+        at.session_state.conversation_type = 'roommate'
+        at.run()
+    assert not at.exception, at.exception
+
+
+def cold(path):
+    """Seconds to the first render of ``path`` in a fresh process, plus which heavy modules it loaded."""
+    script = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        "from benchmarks import bench_startup\n"
+        "at = bench_startup.app_test()\n"
+        "imported = time.perf_counter()\n"
+        f"path = {path!r}\n"
+        "if path != 'logged_out':\n"
+        "    at.run()\n"
+        "    bench_startup.log_in(at)\n"
+        "    bench_startup.rerun(at, path)\n"
+        "bench_startup.rerun(at, path)\n"
+        "done = time.perf_counter()\n"
+        "loaded = [m for m in bench_startup.HEAVY_MODULES if m in sys.modules]\n"
+        "print(json.dumps({'streamlit_import': imported - start, 'first_render': done - imported, 'loaded': loaded}))\n"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        scratch_copy(directory)
+        env = dict(os.environ, PYTHONPATH=ROOT, PYTHONWARNINGS='ignore')
+        output = subprocess.run([sys.executable, '-c', script], cwd=directory, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def warm(path, reruns):
+    """Per-rerun seconds for ``path`` once every cached resource is loaded."""
+    with tempfile.TemporaryDirectory() as directory:
+        scratch_copy(directory)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            at = app_test()
+            at.run()
+            if path != 'logged_out':
+                log_in(at)
+            rerun(at, path)
+            rerun(at, path)
+            times = []
+            for _ in range(reruns):
+                start = time.perf_counter()
+                rerun(at, path)
+                times.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+    return times
+
+
+def run(reruns):
+    for path in PATHS:
+        first = cold(path)
+        times = warm(path, reruns)
+        print(
+            f"{path:<11} | import streamlit {first['streamlit_import']:6.2f}s | first render {first['first_render']:6.2f}s | "
+            f"rerun p50 {metrics.percentile(times, 0.5) * 1e3:7.1f} ms p95 {metrics.percentile(times, 0.95) * 1e3:7.1f} ms | "
+            f"loaded {', '.join(first['loaded']) or '-'}"
+        )
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RERUNS)
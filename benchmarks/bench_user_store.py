@@ -0,0 +1,75 @@
+"""Per-operation latency of the user stores.
+
+    python -m benchmarks.bench_user_store [profiles ...]
+
+The JSON store rewrites the whole file per upsert, so it is only run up to
+JSON_LIMIT profiles.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import user_store
+from benchmarks.synthetic import make_users
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+JSON_LIMIT = 10_000
+OPS = 200
+READER_THREADS = 8
+
+
+def per_op(fn, names):
+    start = time.perf_counter()
+    for name in names:
+        fn(name)
+    return (time.perf_counter() - start) / len(names) * 1e3
+
+
+def concurrent_reads(store, names):
+    def read():
+        for name in names:
+            store.get(name)
+
+    threads = [threading.Thread(target=read) for _ in range(READER_THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return READER_THREADS * len(names) / (time.perf_counter() - start)
+
+
+def run_store(label, store, users, rng):
+    start = time.perf_counter()
+    store.upsert_many(users.items())
+    load = time.perf_counter() - start
+
+    names = [str(name) for name in rng.choice(list(users), OPS)]
+    get_ms = per_op(store.get, names)
+    upsert_ms = per_op(lambda name: store.upsert(name, dict(users[name], bio="edited")), names[:20])
+    start = time.perf_counter()
+    looking = store.find(looking_for_roommate="Yes")
+    find_ms = (time.perf_counter() - start) * 1e3
+    reads = concurrent_reads(store, names)
+    print(f"  {label:<6} | bulk load {load:7.2f}s | get {get_ms:7.3f} ms | upsert {upsert_ms:8.3f} ms | "
+          f"find looking ({len(looking)}) {find_ms:9.1f} ms | {READER_THREADS} readers {reads:9.0f} gets/s")
+
+
+def run(n, seed=0):
+    rng = np.random.default_rng(seed)
+    users = make_users(n, seed)
+    print(f"{n} profiles")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_store('sqlite', user_store.SqliteUserStore(os.path.join(tmp, 'users.sqlite')), users, rng)
+        if n <= JSON_LIMIT:
+            run_store('json', user_store.JsonUserStore(os.path.join(tmp, 'users.json')), users, rng)
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    for n in sizes:
+        run(n)
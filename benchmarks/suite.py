@@ -0,0 +1,190 @@
+"""Headless run of the app's core operations on synthetic data.
+
+    python -m benchmarks.suite [--users N] [--apartments N] [--ops N] [--output run.json] [--compare baseline.json]
+
+Gemini is replaced by the deterministic FakeGenerativeModel, so runs are
+offline and repeatable. Each operation reports throughput and p50/p95/p99
+latency; with --compare, any operation whose p95 grew or whose throughput
+dropped by more than --threshold is flagged and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import apartments
+import chat_samples
+import metrics
+import roommates
+from benchmarks.synthetic import write_dataset
+from chat_history import ChatHistory
+from fake_llm import FakeGenerativeModel
+from llm import LLMScheduler
+from prompts import build_conversation_prompt, format_profile
+from user_store import SqliteUserStore, migrate_json
+
+SUPPORT_ISSUES = [
+    "I can't log in after changing my password.",
+    "My roommate matches stopped updating when I edited my profile.",
+    "The map doesn't show any apartments for 3 bedrooms.",
+    "How do I upload a different chat log?",
+]
+
+
+def measure(name, ops, results):
+    """Time each call of ``ops`` (an iterable of zero-argument callables)."""
+    latencies = []
+    start = time.perf_counter()
+    for op in ops:
+        op_start = time.perf_counter()
+        op()
+        latencies.append(time.perf_counter() - op_start)
+    wall = time.perf_counter() - start
+    results[name] = {
+        'count': len(latencies),
+        'ops_per_s': len(latencies) / wall if wall else 0.0,
+        'p50_ms': metrics.percentile(latencies, 0.50) * 1e3,
+        'p95_ms': metrics.percentile(latencies, 0.95) * 1e3,
+        'p99_ms': metrics.percentile(latencies, 0.99) * 1e3,
+    }
+    stats = results[name]
+    print(f"{name:<18} {stats['count']:>7} ops | {stats['ops_per_s']:>10.1f} ops/s | p50 {stats['p50_ms']:8.3f} ms | p95 {stats['p95_ms']:8.3f} ms | p99 {stats['p99_ms']:8.3f} ms")
+
+
+def run(data_dir, n_ops, seed=0, llm_delay=0.0, chunk_delay=0.0):
+    rng = np.random.default_rng(seed)
+    results = {}
+    styles_dir = os.path.join(data_dir, 'styles')
+    listings_path = os.path.join(data_dir, 'Apartment_DB.parquet')
+
+    index = apartments.ApartmentIndex(apartments.normalize_apartments(pd.read_parquet(listings_path)))
+
+    def apartment_filter(low, width, bedrooms, flags):
+        return lambda: index.query((low, low + width), (bedrooms, bedrooms + 1), *flags)
+
+    measure('apartment_filter', [
+        apartment_filter(int(rng.integers(500, 2500)), int(rng.integers(100, 1500)), int(rng.integers(1, 6)), (rng.random(3) < 0.3).tolist())
+        for _ in range(n_ops)
+    ], results)
+
+    store = SqliteUserStore(os.path.join(data_dir, 'users.sqlite'))
+    if not len(store):
+        migrate_json(os.path.join(data_dir, 'users.json'), store)
+    usernames = list(store)
+    picks = [usernames[i] for i in rng.integers(len(usernames), size=n_ops)]
+    measure('user_load', [lambda username=username: store.get(username) for username in picks], results)
+
+    def save(username, age):
+        def op():
+            user_data = dict(store[username])
+            user_data['age'] = age
+            store.upsert(username, user_data)
+        return op
+
+    measure('user_save', [save(username, int(rng.integers(18, 30))) for username in picks], results)
+
+    users = dict(store.find(looking_for_roommate="Yes"))
+    matcher = roommates.RoommateMatcher(users)
+    looking = [str(username) for username in rng.choice(matcher.usernames, n_ops)]
+    measure('roommate_match', [lambda username=username: matcher.top_matches(username, users[username], k=10) for username in looking], results)
+
+    txt_dir = os.path.join(data_dir, 'txt')
+    with_logs = sorted(name[:-4] for name in os.listdir(txt_dir) if name.endswith('.txt'))
+    profiles = {username: store[username] for username in with_logs}
+
+    def style_sample(username, build=False):
+        load = chat_samples.save_style_sample if build else chat_samples.load_style_sample
+        return load(os.path.join(txt_dir, f"{username}.txt"), username, profiles[username]['full_name'], styles_dir=styles_dir)
+
+    measure('style_sample_build', [lambda username=username: style_sample(username, build=True) for username in with_logs], results)
+
+    pairs = [tuple(str(name) for name in rng.choice(with_logs, 2, replace=False)) for _ in range(n_ops)]
+
+    def prompt(pair):
+        a, b = pair
+        return build_conversation_prompt(style_sample(a), format_profile(profiles[a], "User A"), style_sample(b), format_profile(profiles[b], "User B"))
+
+    measure('prompt_build', [lambda pair=pair: prompt(pair) for pair in pairs], results)
+
+    model = FakeGenerativeModel(first_chunk_delay=llm_delay, chunk_delay=chunk_delay)
+    scheduler = LLMScheduler(cache=None, concurrency=4)
+    prompts = [prompt(pair) for pair in pairs]
+
+    def conversation(text):
+        return lambda: ''.join(scheduler.stream(model, text, {}))
+
+    measure('conversation', [conversation(text) for text in prompts], results)
+
+    history = ChatHistory()
+
+    def support(issue):
+        def op():
+            chat = model.start_chat(history=history.to_history())
+            reply = ''.join(scheduler.stream_call(lambda: chat.send_message(issue, stream=True), {}))
+            history.add("user", issue)
+            history.add("model", reply)
+        return op
+
+    measure('tech_support', [support(SUPPORT_ISSUES[i % len(SUPPORT_ISSUES)]) for i in range(n_ops)], results)
+    scheduler.pool.shutdown()
+    return results
+
+
+def compare(results, baseline, threshold, min_ms=0.05):
+    """Print per-operation changes against ``baseline``; returns the regressed operation names.
+
+    A p95 increase smaller than ``min_ms`` is treated as timer noise.
+    """
+    regressions = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        p95_change = stats['p95_ms'] / before['p95_ms'] - 1 if before['p95_ms'] else 0.0
+        throughput_change = stats['ops_per_s'] / before['ops_per_s'] - 1 if before['ops_per_s'] else 0.0
+        regressed = (p95_change > threshold and stats['p95_ms'] - before['p95_ms'] > min_ms) or throughput_change < -threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<18} p95 {p95_change:+7.1%} | throughput {throughput_change:+7.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--apartments', type=int, default=10_000)
+    parser.add_argument('--chat-logs', type=int, default=200)
+    parser.add_argument('--ops', type=int, default=1000, help="operations timed per benchmark")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data', help="reuse (or create) the dataset in this directory instead of a temporary one")
+    parser.add_argument('--llm-delay', type=float, default=0.0, help="fake model delay before the first chunk, in seconds")
+    parser.add_argument('--chunk-delay', type=float, default=0.0, help="fake model delay between chunks, in seconds")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--compare', help="results JSON from an earlier run")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative change that counts as a regression")
+    parser.add_argument('--min-ms', type=float, default=0.05, help="ignore p95 increases smaller than this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = args.data or tmp
+        if not os.path.exists(os.path.join(data_dir, 'users.json')):
+            write_dataset(data_dir, args.users, args.apartments, args.chat_logs, seed=args.seed)
+        results = run(data_dir, args.ops, args.seed, args.llm_delay, args.chunk_delay)
+
+    config = {key: getattr(args, key) for key in ('users', 'apartments', 'chat_logs', 'ops', 'seed', 'llm_delay', 'chunk_delay')}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': config, 'python': platform.python_version(), 'created': time.time(), 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline['config'] != config:
+            print(f"warning: baseline was run with {baseline['config']}")
+        if compare(results, baseline['results'], args.threshold, args.min_ms):
+            sys.exit(1)
@@ -0,0 +1,136 @@
+"""Synthetic users, chat logs and apartment listings at any scale.
+
+    python -m benchmarks.synthetic OUT_DIR [--users N] [--apartments N] [--chat-logs N] [--xlsx]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+APARTMENT_NAMES = ['The Standard at Seattle', 'The M Seattle', 'Oliv', 'Lothlorien', 'Arista', 'Nordheim Court', 'Twelve at U District', 'Sora']
+
+
+def make_apartments(n, seed=0):
+    rng = np.random.default_rng(seed)
+    yes_no = np.array(['Yes', 'No'])
+    return pd.DataFrame({
+        'Apartment': rng.choice(APARTMENT_NAMES, n),
+        'Layout Name': [f"L{i % 40}" for i in range(n)],
+        'Cost': rng.integers(500, 3200, n),
+        'Bedrooms': rng.integers(1, 7, n),
+        'Allow Pets?': rng.choice(yes_no, n),
+        'Parking?': rng.choice(yes_no, n),
+        'Gymnasium?': rng.choice(yes_no, n),
+        'Shared bedroom or private bedroom?': rng.choice(['Shared', 'Private'], n),
+        'Shared bathroom?': np.full(n, np.nan),
+        'Available?': rng.choice(yes_no, n, p=[0.8, 0.2]),
+        'Address': [f"{4000 + i % 900} University Way NE, Seattle, WA" for i in range(n)],
+        'Link': [f"https://example.com/listing/{i}" for i in range(n)],
+        'Latitude': 47.66 + rng.normal(0, 0.02, n),
+        'Longitude': -122.31 + rng.normal(0, 0.02, n),
+    })
+
+
+SCHOOL_YEARS = ["Freshman", "Sophomore", "Junior", "Senior", "Graduate", "Other"]
+ROOMMATE_YEARS = ["Any", "Freshman", "Sophomore", "Junior", "Senior", "Other"]
+GENDERS = ["Male", "Female", "Non-binary", "Prefer not to say", "Other"]
+SLEEPING = ["Night owl", "Early bird", "Both"]
+GUESTS = ["I like having guests over frequently", "I occasionally host people", "No guests"]
+MAJORS = ["CS", "HCDE", "Informatics", "Biology", "Economics", "Sports Management"]
+FIRST_NAMES = ["Alex", "Jordan", "Caitlin", "John", "Michael", "Rome", "Patrick", "Jess", "Chris", "Jamie", "Max", "Ty", "Priya", "Wei", "Sofia", "Diego"]
+LAST_NAMES = ["Doe", "Clark", "Odunze", "Mahomes", "Penix", "James", "Nguyen", "Garcia", "Kim", "Patel"]
+
+
+def make_users(n, seed=0, looking_ratio=0.8):
+    rng = np.random.default_rng(seed)
+    users = {}
+    for i in range(n):
+        looking = "Yes" if rng.random() < looking_ratio else "No"
+        user_data = {
+            'password': f"pw{i}",
+            'full_name': f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}",
+            'college': "uw",
+            'school_year': SCHOOL_YEARS[rng.integers(len(SCHOOL_YEARS))],
+            'major': MAJORS[rng.integers(len(MAJORS))],
+            'apartment_option': "Still Searching",
+            'age': int(rng.integers(18, 30)),
+            'gender': GENDERS[rng.integers(len(GENDERS))],
+            'smoking_habits': bool(rng.random() < 0.15),
+            'sleeping_habits': SLEEPING[rng.integers(len(SLEEPING))],
+            'guest_preferences': GUESTS[rng.integers(len(GUESTS))],
+            'has_pet': bool(rng.random() < 0.3),
+            'bio': f"I am synthetic user number {i}.",
+            'looking_for_roommate': looking,
+        }
+        if looking == "Yes":
+            user_data.update({
+                'roommate_smoking': bool(rng.random() < 0.2),
+                'roommate_has_pets': bool(rng.random() < 0.5),
+                'roommate_year': ROOMMATE_YEARS[rng.integers(len(ROOMMATE_YEARS))],
+                'night_person': SLEEPING[rng.integers(len(SLEEPING))],
+                'gatherings': GUESTS[rng.integers(len(GUESTS))],
+            })
+        users[f"user{i}"] = user_data
+    return users
+
+
+CHAT_PHRASES = [
+    "Hey, you won't believe what just happened", "lol no way", "Honestly I have no idea 😂",
+    "Are you coming to the game tonight?", "bro that's wild", "I'm so tired from practice today",
+    "Wait what happened next?", "Haha okay okay 😎", "Let's grab food after class!",
+    "Did you finish the assignment?", "nah not yet, maybe tomorrow", "That's hilarious 🤣",
+    "Can't wait for the weekend", "Dude the bus was late again 🙃", "Sounds good, see you then",
+]
+
+
+def make_chat_log(names, n_messages, seed=0):
+    """WhatsApp-style export, e.g. "[10/13/24, 7:20 PM] John: Hey ..."."""
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(n_messages):
+        minute = i % 60
+        hour = 1 + (i // 60) % 12
+        day = 1 + (i // 720) % 28
+        name = names[i % len(names)] if rng.random() < 0.8 else names[rng.integers(len(names))]
+        phrase = CHAT_PHRASES[rng.integers(len(CHAT_PHRASES))]
+        if rng.random() < 0.3:
+            phrase = f"{phrase} {CHAT_PHRASES[rng.integers(len(CHAT_PHRASES))].lower()}"
+        lines.append(f"[10/{day}/24, {hour}:{minute:02d} PM] {name}: {phrase}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_dataset(out_dir, n_users, n_apartments, n_chat_logs=200, messages_per_log=40, seed=0, xlsx=False):
+    """Lay out a data directory shaped like the repo root: users.json, txt/ and the apartment sheet."""
+    os.makedirs(os.path.join(out_dir, 'txt'), exist_ok=True)
+    users = make_users(n_users, seed)
+    with open(os.path.join(out_dir, 'users.json'), 'w') as f:
+        json.dump(users, f, indent=4)
+
+    friends = FIRST_NAMES[::-1]
+    for i, (username, user_data) in enumerate(list(users.items())[:n_chat_logs]):
+        first_name = user_data['full_name'].split()[0]
+        friend = next(name for name in friends[i % len(friends):] + friends if name != first_name)
+        with open(os.path.join(out_dir, 'txt', f"{username}.txt"), 'w', encoding='utf-8') as f:
+            f.write(make_chat_log([first_name, friend], messages_per_log, seed + i))
+
+    listings = make_apartments(n_apartments, seed)
+    if xlsx:
+        listings.to_excel(os.path.join(out_dir, 'Apartment_DB.xlsx'), index=False)
+    listings.to_parquet(os.path.join(out_dir, 'Apartment_DB.parquet'), index=False)
+    return users, listings
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--apartments', type=int, default=10_000)
+    parser.add_argument('--chat-logs', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=40, help="messages per chat log")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--xlsx', action='store_true', help="also write Apartment_DB.xlsx (slow for large sheets)")
+    args = parser.parse_args()
+    write_dataset(args.out_dir, args.users, args.apartments, args.chat_logs, args.messages, args.seed, args.xlsx)
+    print(f"wrote {args.users} users, {min(args.chat_logs, args.users)} chat logs and {args.apartments} listings to {args.out_dir}")
@@ -0,0 +1,109 @@
+import re
+import sys
+from collections import deque
+
+from chat_samples import approx_tokens
+
+MAX_TOKENS = 2000
+SUMMARY_TOKENS = 400
+SUMMARY_PREFIX = "Summary of our earlier conversation:\n"
+SUMMARY_ACK = "Got it, I'll keep that in mind."
+
+
+def first_sentence(text, limit=160):
+    sentence = re.split(r'(?<=[.!?])\s', ' '.join(text.split()), maxsplit=1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1] + '…'
+
+
+def extractive_summary(summary, folded, budget):
+    """Append one line per folded turn and keep the newest lines that fit ``budget``."""
+    lines = summary.splitlines() if summary else []
+    for role, text in folded:
+        lines.append(f"{'User' if role == 'user' else 'Assistant'}: {first_sentence(text)}")
+    kept, used = [], 0
+    for line in reversed(lines):
+        used += approx_tokens(line) + 1
+        if used > budget:
+            break
+        kept.append(line)
+    return '\n'.join(reversed(kept))
+
+
+class ChatHistory:
+    """Tech-support history with a hard ceiling on what gets sent to Gemini.
+
+    Recent turns are kept verbatim. Once they exceed ``max_tokens -
+    summary_tokens`` the oldest ones are folded into a rolling summary by
+    ``summarizer(summary, [(role, text), ...], budget)``. to_history() never
+    exceeds about ``max_tokens`` however long the session runs.
+    """
+
+    def __init__(self, max_tokens=MAX_TOKENS, summary_tokens=SUMMARY_TOKENS, summarizer=extractive_summary):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer
+        self.turns = deque()
+        self.turn_tokens = 0
+        self.summary = ''
+        self.added = 0
+
+    @classmethod
+    def from_history(cls, messages, **kwargs):
+        """Rebuild from Gemini ``history`` messages, e.g. a client's, bounded like one kept here."""
+        history = cls(**kwargs)
+        for message in messages:
+            if message['role'] not in ('user', 'model'):
+                raise ValueError(f"unknown role {message['role']!r}")
+            history.add(message['role'], ''.join(str(part['text']) for part in message['parts']))
+        return history
+
+    @property
+    def turn_budget(self):
+        return self.max_tokens - self.summary_tokens
+
+    def add(self, role, text):
+        text = str(text)
+        if approx_tokens(text) > self.turn_budget:
+            # a single huge paste keeps its beginning, where the question usually is
+            text = text[:self.turn_budget * 4 - 1] + '…'
+        tokens = approx_tokens(text)
+        self.turns.append((role, text, tokens))
+        self.turn_tokens += tokens
+        self.added += 1
+
+        folded = []
+        while self.turn_tokens > self.turn_budget:
+            old_role, old_text, old_tokens = self.turns.popleft()
+            self.turn_tokens -= old_tokens
+            folded.append((old_role, old_text))
+        if folded:
+            self.summary = self.summarizer(self.summary, folded, self.summary_tokens - approx_tokens(SUMMARY_PREFIX + SUMMARY_ACK))
+
+    def tokens(self):
+        return sum(approx_tokens(message['parts'][0]['text']) for message in self.to_history())
+
+    def to_history(self):
+        """Gemini ``start_chat`` history: the summary exchange, then the recent turns.
+
+        Consecutive turns from the same role are merged so roles alternate.
+        """
+        messages = []
+        if self.summary:
+            messages.append({"role": "user", "parts": [{"text": SUMMARY_PREFIX + self.summary}]})
+            messages.append({"role": "model", "parts": [{"text": SUMMARY_ACK}]})
+        for role, text, _ in self.turns:
+            if messages and messages[-1]['role'] == role:
+                messages[-1]['parts'][0]['text'] += '\n\n' + text
+            else:
+                messages.append({"role": role, "parts": [{"text": text}]})
+        return messages
+
+    def footprint(self):
+        """Approximate bytes held by this history."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.turns) + sys.getsizeof(self.summary)
+        for turn in self.turns:
+            size += sys.getsizeof(turn) + sum(sys.getsizeof(item) for item in turn)
+        return size
+
+    def __len__(self):
+        return self.added
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+LOGS_DIR = 'txt'
+CHUNK_SIZE = 64 * 1024
+MAX_UPLOAD_BYTES = 8 * 1024 * 1024
+CACHE_CHARS = 32 * 1024 * 1024
+
+DIGEST_RE = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadTooLarge(ValueError):
+    """An upload went over the store's ``max_bytes``."""
+
+
+def too_large(max_bytes):
+    return UploadTooLarge(f"Chat logs can be at most {max_bytes / (1024 * 1024):g} MB.")
+
+
+def iter_chunks(data, chunk_size=CHUNK_SIZE):
+    """``data`` as a sequence of byte chunks: bytes, a binary file object, or already an iterable of chunks."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = memoryview(data)
+        for start in range(0, len(data), chunk_size):
+            yield data[start:start + chunk_size]
+    elif hasattr(data, 'read'):
+        while True:
+            chunk = data.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+    else:
+        yield from data
+
+
+class Upload:
+    """One upload being written to a temp file and hashed as it arrives."""
+
+    def __init__(self, store):
+        self.store = store
+        self.size = 0
+        self.hash = hashlib.sha256()
+        os.makedirs(store.objects_dir, exist_ok=True)
+        self.tmp_path = os.path.join(store.objects_dir, f".upload.{uuid.uuid4().hex}.tmp")
+        self.file = open(self.tmp_path, 'wb')
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.store.max_bytes:
+            raise too_large(self.store.max_bytes)
+        self.hash.update(chunk)
+        self.file.write(chunk)
+
+    def finish(self):
+        """Move the upload to its content address; returns the digest."""
+        self.file.close()
+        digest = self.hash.hexdigest()
+        path = self.store.path(digest)
+        if os.path.exists(path):
+            # already stored by an identical upload
+            os.remove(self.tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self.tmp_path, path)
+        return digest
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ChatLogStore:
+    """Uploaded chat logs stored once per distinct content, under their SHA-256.
+
+    Uploads are written in chunks and rejected past ``max_bytes``, so a
+    large or endless upload never sits in memory whole. Stored files never
+    change, which lets decoded text be cached by digest (up to
+    ``cache_chars`` characters of it) with no staleness check.
+    """
+
+    def __init__(self, root=LOGS_DIR, max_bytes=MAX_UPLOAD_BYTES, cache_chars=CACHE_CHARS):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'sha256')
+        self.max_bytes = max_bytes
+        self.cache_chars = cache_chars
+        self.cache = OrderedDict()
+        self.cached_chars = 0
+        self.lock = threading.Lock()
+
+    def path(self, digest):
+        if not DIGEST_RE.fullmatch(digest or ''):
+            raise ValueError(f"not a chat log digest: {digest!r}")
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.txt")
+
+    def __contains__(self, digest):
+        return DIGEST_RE.fullmatch(digest or '') is not None and os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Store ``data`` (see iter_chunks); returns its digest. Raises UploadTooLarge past ``max_bytes``."""
+        upload = Upload(self)
+        try:
+            for chunk in iter_chunks(data):
+                upload.write(chunk)
+        except BaseException:
+            upload.discard()
+            raise
+        return upload.finish()
+
+    def text(self, digest):
+        with self.lock:
+            text = self.cache.get(digest)
+            if text is not None:
+                self.cache.move_to_end(digest)
+                return text
+        with open(self.path(digest), 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        with self.lock:
+            if digest not in self.cache and len(text) <= self.cache_chars:
+                self.cache[digest] = text
+                self.cached_chars += len(text)
+                while self.cached_chars > self.cache_chars:
+                    _, evicted = self.cache.popitem(last=False)
+                    self.cached_chars -= len(evicted)
+        return text
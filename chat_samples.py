@@ -0,0 +1,155 @@
+import json
+import os
+import re
+from collections import Counter
+
+STYLES_DIR = '.cache/styles'
+TOKEN_BUDGET = 400
+MAX_MESSAGE_CHARS = 280
+
+# "[10/13/24, 7:20 PM] John: message", as exported from WhatsApp
+LINE_RE = re.compile(r'^\[(?P<date>[^,\]]+),\s*(?P<time>[^\]]+)\]\s*(?P<name>[^:]+?):\s?(?P<message>.*)$')
+EMOJI_RE = re.compile('[\U0001F1E6-\U0001F1FF\U0001F300-\U0001FAFF\u2600-\u27BF]')
+
+
+def approx_tokens(text):
+    # roughly four characters per token for English chat text
+    return (len(text) + 3) // 4
+
+
+def parse_chat(text):
+    """List of (name, message) pairs; lines without a header continue the previous message."""
+    messages = []
+    for line in text.splitlines():
+        match = LINE_RE.match(line.strip('\ufeff'))
+        if match:
+            messages.append([match.group('name').strip(), match.group('message').strip()])
+        elif messages and line.strip():
+            messages[-1][1] += '\n' + line.strip()
+    return [(name, message) for name, message in messages]
+
+
+def name_tokens(*names):
+    tokens = set()
+    for name in names:
+        tokens.update(re.sub(r'\d+', ' ', name or '').lower().split())
+    return tokens
+
+
+def find_author(messages, username, full_name):
+    """Which speaker in the log is the uploading user.
+
+    A speaker matches when their name shares a word (or a prefix of at least
+    three letters, e.g. "Pat" for "Patrick") with the username or full name.
+    Otherwise the first speaker is assumed to be the one who exported the chat.
+    """
+    wanted = name_tokens(username, full_name)
+    speakers = list(dict.fromkeys(name for name, _ in messages))
+    for speaker in speakers:
+        for token in name_tokens(speaker):
+            if any(token == w or (min(len(token), len(w)) >= 3 and (w.startswith(token) or token.startswith(w))) for w in wanted):
+                return speaker
+    return speakers[0] if speakers else None
+
+
+def style_stats(own):
+    emojis = Counter(e for message in own for e in EMOJI_RE.findall(message))
+    count = len(own) or 1
+    return {
+        'messages': len(own),
+        'avg_words': round(sum(len(m.split()) for m in own) / count, 1),
+        'emoji_per_message': round(sum(emojis.values()) / count, 2),
+        'top_emojis': ''.join(e for e, _ in emojis.most_common(5)),
+        'lowercase_share': round(sum(m == m.lower() for m in own) / count, 2),
+        'question_share': round(sum('?' in m for m in own) / count, 2),
+        'exclamation_share': round(sum('!' in m for m in own) / count, 2),
+    }
+
+
+def spread(items, count):
+    if count <= 1:
+        return items[len(items) // 2:][:count]
+    return [items[round(j * (len(items) - 1) / (count - 1))] for j in range(count)]
+
+
+def pick_messages(own, budget, max_chars=MAX_MESSAGE_CHARS):
+    """Deduplicated messages spread evenly over the length distribution, in chat order."""
+    seen = set()
+    candidates = []
+    for i, message in enumerate(own):
+        normalized = ' '.join(message.lower().split())
+        if normalized not in seen and len(message) <= max_chars:
+            seen.add(normalized)
+            candidates.append(i)
+    candidates.sort(key=lambda i: len(own[i]))
+
+    def cost(picks):
+        return sum(approx_tokens(own[i]) + 2 for i in picks)
+
+    # largest evenly spaced selection that still fits the budget
+    low, high = 0, len(candidates)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if cost(spread(candidates, mid)) <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    return [own[i] for i in sorted(set(spread(candidates, low)))]
+
+
+def build_style_sample(text, username, full_name='', budget=TOKEN_BUDGET):
+    """Compact description of how ``username`` texts, at most ~``budget`` tokens."""
+    messages = parse_chat(text)
+    author = find_author(messages, username, full_name)
+    if author is None:
+        return ''
+    own = [message for name, message in messages if name == author]
+    stats = style_stats(own)
+    header = (
+        f"Style notes for {author}: {stats['messages']} messages, about {stats['avg_words']} words each, "
+        f"{stats['emoji_per_message']} emoji per message{' (mostly ' + stats['top_emojis'] + ')' if stats['top_emojis'] else ''}, "
+        f"{int(stats['lowercase_share'] * 100)}% all lowercase, {int(stats['question_share'] * 100)}% questions, "
+        f"{int(stats['exclamation_share'] * 100)}% with exclamations.\n"
+        f"Sample messages by {author}:\n"
+    )
+    lines = [f"{author}: {message}" for message in pick_messages(own, budget - approx_tokens(header))]
+    return header + '\n'.join(lines)
+
+
+def style_path(username, styles_dir=STYLES_DIR):
+    return os.path.join(styles_dir, f"{username}.json")
+
+
+def save_style_sample(txt_path, username, full_name='', budget=TOKEN_BUDGET, styles_dir=STYLES_DIR, text=None):
+    """Preprocess an uploaded chat log once and store the sample next to the others.
+
+    ``text`` is the already decoded log, if the caller has it.
+    """
+    if text is None:
+        with open(txt_path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    sample = build_style_sample(text, username, full_name, budget)
+    stat = os.stat(txt_path)
+    os.makedirs(styles_dir, exist_ok=True)
+    path = style_path(username, styles_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'source': [stat.st_mtime_ns, stat.st_size], 'budget': budget, 'sample': sample}, f)
+    os.replace(tmp_path, path)
+    return sample
+
+
+def load_style_sample(txt_path, username, full_name='', budget=TOKEN_BUDGET, styles_dir=STYLES_DIR, read_text=None):
+    """Stored sample for ``txt_path``, rebuilt if the log was replaced or never processed.
+
+    On a rebuild, ``read_text()`` supplies the decoded log instead of reading ``txt_path``.
+    """
+    stat = os.stat(txt_path)
+    try:
+        with open(style_path(username, styles_dir), 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored['source'] == [stat.st_mtime_ns, stat.st_size] and stored['budget'] == budget:
+            return stored['sample']
+    except (OSError, ValueError, KeyError):
+        pass
+    return save_style_sample(txt_path, username, full_name, budget, styles_dir, read_text() if read_text is not None else None)
@@ -1,46 +1,56 @@
 import streamlit as st
-import google.generativeai as genai
-import pandas as pd
-import pydeck as pdk
-import json
 import os
-import time
-
-def load_apartment_data(file_path):
-    try:
-        df = pd.read_excel(file_path)
-        return df
-    except Exception as e:
-        st.error(f"Error loading file: {e}")
-        return pd.DataFrame() 
-
-def load_user_txt(username):
-    txt_path = f"txt/{username}.txt"
-    if os.path.exists(txt_path):
-        with open(txt_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            return content
-    else:
-        return ""
-    
-def format_profile(user_profile, user_label):
-    profile_info = f"""
-                    {user_label}'s Profile:
-                    - Full Name: {user_profile.get('full_name', 'N/A')}
-                    - Age: {user_profile.get('age', 'N/A')}
-                    - Gender: {user_profile.get('gender', 'N/A')}
-                    - College: {user_profile.get('college', 'N/A')}
-                    - Major: {user_profile.get('major', 'N/A')}
-                    - School Year: {user_profile.get('school_year', 'N/A')}
-                    - Smoking Habits: {user_profile.get('smoking_habits', 'N/A')}
-                    - Sleeping Habits: {user_profile.get('sleeping_habits', 'N/A')}
-                    - Guest Preferences: {user_profile.get('guest_preferences', 'N/A')}
-                    - Has Pet: {'Yes' if user_profile.get('has_pet') else 'No'}
-                    - Bio: {user_profile.get('bio', 'N/A')}
-                    """
-    return profile_info
-
-apartment_data = load_apartment_data('Apartment_DB.xlsx')
+import api_client
+import chat_history
+import chat_logs
+import metrics
+import service
+import uuid
+# pandas, numpy, pydeck and google.generativeai are imported where they are
+# first needed, so the login screen doesn't pay for them
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+# stage timings for this rerun (LEASY_METRICS=1), or with LEASY_PROFILE=1 a cProfile
+# dump of the one rerun opened with ?profile=1; the parameter is dropped so the next rerun isn't traced
+profile = st.query_params.get("profile") == "1"
+if profile:
+    st.query_params.pop("profile")
+metrics.start_rerun(st.session_state.session_id, st.session_state.get("username"), profile=profile)
+if metrics.enabled and os.environ.get("LEASY_METRICS_PORT"):
+    metrics.serve(int(os.environ["LEASY_METRICS_PORT"]))
+
+API_URL = os.environ.get("LEASY_API_URL")
+API_TOKEN = os.environ.get("LEASY_API_TOKEN")
+
+@st.cache_resource(show_spinner=False)
+def load_service():
+    return service.LeasyService()
+
+@st.cache_resource(show_spinner=False)
+def load_api_client(url, token):
+    return api_client.ApiClient(url, token)
+
+def get_backend():
+    # a thin client of api.py when LEASY_API_URL is set, otherwise the same operations in-process
+    return load_api_client(API_URL, API_TOKEN) if API_URL else load_service()
+
+MAP_ZOOM = 12
+APARTMENT_PAGE_SIZE = 20
+APARTMENT_PAGES_KEPT = 32
+ROOMMATE_PREFETCH = 3
+
+def search_apartments(query, page):
+    # per-session cache of result pages by preference tuple, so reruns don't search again
+    pages = st.session_state.setdefault("apartment_pages", {})
+    key = (query, page)
+    result = pages.pop(key, None)
+    if result is None:
+        result = backend.search_apartments(*query, page=page, page_size=APARTMENT_PAGE_SIZE, zoom=MAP_ZOOM)
+    pages[key] = result
+    for stale in list(pages)[:-APARTMENT_PAGES_KEPT]:
+        del pages[stale]
+    return result
 
 st.set_page_config(
     page_title="LeasyBot",
@@ -55,30 +65,24 @@ if "app_key" not in st.session_state:
         st.session_state.app_key = app_key
         
 if "history" not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = chat_history.ChatHistory()
 
 if "conversation_type" not in st.session_state:
     st.session_state.conversation_type = None
 
-try:
-    genai.configure(api_key=st.session_state.app_key)
-except AttributeError as e:
+if "app_key" not in st.session_state:
     st.warning("Please Put Your Gemini API Key First")
 
-model = genai.GenerativeModel("gemini-pro")
+backend = get_backend()
 
-USERS_FILE = 'users.json'
-
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    else:
-        return {}
+LLM_TIMINGS_KEPT = 50
 
-def save_users(users):
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=4)
+def show_llm_timing(kind, timings):
+    # per-session log of time to first token and total latency for each LLM request
+    log = st.session_state.setdefault("llm_timings", [])
+    log.append({"kind": kind, **timings})
+    del log[:-LLM_TIMINGS_KEPT]
+    st.caption(f"First text after {timings.get('ttft', 0):.2f}s, complete after {timings.get('total', 0):.2f}s")
 
 if "signup_mode" not in st.session_state:
     st.session_state.signup_mode = False  
@@ -86,8 +90,6 @@ if "signup_mode" not in st.session_state:
 if "login_mode" not in st.session_state:
     st.session_state.login_mode = False 
 
-users = load_users()
-
 with st.sidebar:
     st.title("**Hi, EasyLeasy users!**")
     st.markdown("")
@@ -97,8 +99,9 @@ with st.sidebar:
     st.markdown("")
 
     if st.button("Clear Chat Window", use_container_width=True, type="primary"):
-        st.session_state.history = []
+        st.session_state.history = chat_history.ChatHistory()
         st.session_state.conversation_type = None
+        st.session_state.pop("apartment_query", None)
         st.rerun()
 
     if 'username' in st.session_state:
@@ -110,8 +113,9 @@ with st.sidebar:
 
         if st.button("Logout"):
             del st.session_state['username']
-            st.session_state.history = []
+            st.session_state.history = chat_history.ChatHistory()
             st.session_state.conversation_type = None
+            st.session_state.pop("apartment_query", None)
             st.success("Logged out successfully!")
     else:
         if st.button("Sign In", icon="🔑", use_container_width=True):
@@ -129,11 +133,11 @@ if st.session_state.get('login_mode'):
     password = st.text_input("Password", type='password', key="login_password")
 
     if st.button("Login", use_container_width=True):
-        if username in users and users[username]['password'] == password:
+        if backend.login(username, password):
             st.success("Login Successful!")
             st.session_state.username = username  # Store the logged-in username in session state
             st.session_state.login_mode = False
-            st.session_state.history = []
+            st.session_state.history = chat_history.ChatHistory()
             st.session_state.conversation_type = None
         else:
             st.error("Invalid username or password")
@@ -177,7 +181,7 @@ if st.session_state.get('signup_mode'):
     if submit_button:
         if new_password != confirm_password:
             st.error("Passwords do not match!")
-        elif new_username in users:
+        elif backend.get_user(new_username) is not None:
             st.error("Username already exists! Please choose a different one.")
         elif txt_file is None:
             st.error("Please upload a .txt file.")
@@ -209,20 +213,24 @@ if st.session_state.get('signup_mode'):
                     'gatherings': gatherings
                 })
 
-            users[new_username] = user_data
-            save_users(users)
-
-            with open(f"txt/{new_username}.txt", "wb") as f:
-                f.write(txt_file.getbuffer())
-
-            st.success(f"Account created successfully for {full_name}!")
-            st.session_state.signup_mode = False
+            try:
+                # stored before the account, so a rejected upload leaves no account without a log
+                txt_file.seek(0)
+                user_data[service.CHAT_LOG_FIELD] = backend.store_chat_log(txt_file)
+            except chat_logs.UploadTooLarge as e:
+                st.error(str(e))
+            else:
+                if backend.create_user(new_username, user_data):
+                    st.success(f"Account created successfully for {full_name}!")
+                    st.session_state.signup_mode = False
+                else:
+                    st.error("Username already exists! Please choose a different one.")
 
 # Profile Page
 if 'username' in st.session_state and st.session_state.get('show_profile', False):
     st.write("## Your Profile")
 
-    current_user = users[st.session_state.username]
+    current_user = backend.get_user(st.session_state.username)
 
     with st.form("profile_form"):
         full_name = st.text_input("Full Name", value=current_user['full_name'])
@@ -241,7 +249,7 @@ if 'username' in st.session_state and st.session_state.get('show_profile', False
         submit_profile = st.form_submit_button("Save Changes")
 
     if submit_profile:
-        users[st.session_state.username].update({
+        changes = {
             'full_name': full_name,
             'college': college,
             'school_year': school_year,
@@ -254,9 +262,10 @@ if 'username' in st.session_state and st.session_state.get('show_profile', False
             'guest_preferences': guest_preferences,
             'has_pet': has_pet,
             'bio': bio
-        })
-        print(users[st.session_state.username])
-        save_users(users)
+        }
+        current_user.update(changes)
+        print(current_user)
+        backend.update_user(st.session_state.username, changes)
         st.success("Profile updated successfully!")
 
 
@@ -296,41 +305,53 @@ if 'username' in st.session_state:
         
         if st.button("Submit Preferences"):
             preferences = f"Looking for apartments with a budget range of {price_range[0]} to {price_range[1]}, with {num_bedrooms} bedrooms. Pets allowed: {allow_pets}, Parking needed: {need_parking}, Gym: {need_gym}."
-            st.session_state.history.append({"role": "user", "parts": [{"text": preferences}]})
-        
-            
-            filtered_apartments = apartment_data[
-                (apartment_data['Cost'] >= price_range[0]) &
-                (apartment_data['Cost'] <= price_range[1]) &
-                (apartment_data['Bedrooms'] >= num_bedrooms[0]) &
-                (apartment_data['Bedrooms'] <= num_bedrooms[1]) &
-                (apartment_data['Allow Pets?'].astype(bool) == allow_pets if allow_pets else True) &  
-                (apartment_data['Parking?'].astype(bool) == need_parking if need_parking else True) & 
-                (apartment_data['Gymnasium?'].astype(bool) == need_gym if need_gym else True)        
-            ]
-            if not filtered_apartments.empty:
+            st.session_state.history.add("user", preferences)
+            # kept in the session so paging through the results doesn't need another submit
+            st.session_state.apartment_query = (tuple(price_range), tuple(num_bedrooms), allow_pets, need_parking, need_gym)
+            st.session_state.apartment_page = 1
+            st.session_state.apartment_pages = {}
+
+        if st.session_state.get("apartment_query") is not None:
+            page = st.session_state.get("apartment_page", 1)
+            try:
+                with metrics.span("apartment_filter"):
+                    result = search_apartments(st.session_state.apartment_query, page)
+            except Exception as e:
+                st.error(f"Error loading apartments: {e}")
+                result = {'total': 0}
+            if result['total']:
+                import pandas as pd
                 st.write("### Apartments that match your preferences:")
-                st.dataframe(filtered_apartments)
-                if 'Latitude' in filtered_apartments.columns and 'Longitude' in filtered_apartments.columns:
-                    map_data = filtered_apartments[['Latitude', 'Longitude']].dropna()
-                    map_data = map_data.rename(columns={'Latitude': 'latitude', 'Longitude': 'longitude'})
-                    map_data = map_data.astype({'latitude': 'float', 'longitude': 'float'})
-                    if not map_data.empty:
+                pages = result['pages']
+                if pages > 1:
+                    st.number_input("Page", min_value=1, max_value=pages, key="apartment_page")
+                listings = result['listings']
+                st.dataframe(pd.DataFrame(listings['data'], index=listings['index'], columns=listings['columns']))
+                st.caption(f"{result['total']} apartments, best matches first (page {result['page']} of {pages})")
+                if result['has_coordinates']:
+                    # one dot per cluster of nearby listings instead of every listing
+                    clusters = result['clusters']
+                    if clusters:
+                        import pydeck as pdk
+                        # listings without coordinates are in the total but not on the map
+                        mapped = sum(c['count'] for c in clusters)
                         layer = pdk.Layer(
                             'ScatterplotLayer',
-                            data=map_data,
+                            data=clusters,
                             get_position='[longitude, latitude]',
                             get_color='[200, 30, 0, 160]',
-                            get_radius=50,
+                            get_radius='radius',
+                            radius_units='pixels',
                             pickable=True,
                         )
                         view_state = pdk.ViewState(
-                            latitude=map_data['latitude'].mean(),
-                            longitude=map_data['longitude'].mean(),
-                            zoom=12,  # adjust zoom
+                            latitude=sum(c['latitude'] * c['count'] for c in clusters) / mapped,
+                            longitude=sum(c['longitude'] * c['count'] for c in clusters) / mapped,
+                            zoom=MAP_ZOOM,
                             pitch=0
                         )
-                        st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state))
+                        with metrics.span("pydeck_render"):
+                            st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip={"text": "{count} listings, ${min_cost} to ${max_cost}"}))
                     else:
                         st.write("No valid coordinates available for the selected apartments.")
                 else:
@@ -341,31 +362,13 @@ if 'username' in st.session_state:
     elif st.session_state.conversation_type == "roommate":
         st.write("*Finding a roommate based on your preferences...*")
 
-        current_user = users[st.session_state.username]
+        current_user = backend.get_user(st.session_state.username)
 
         # user is looking for a roommate
         if current_user.get('looking_for_roommate') == "Yes":
             # filter matching users
-            matching_users = []
-            for username, user_data in users.items():
-                if username != st.session_state.username and user_data.get('looking_for_roommate') == "Yes":
-                    # check if the user fits the criteria
-                    count = 0
-                    if user_data.get('smoking_habits') == current_user.get('roommate_smoking'):
-                        count += 1
-                    if user_data.get('has_pet') == current_user.get('roommate_has_pets'):
-                        count += 1
-                    if user_data.get('school_year') == current_user.get('roommate_year'):
-                        count += 1
-                    if user_data.get('sleeping_habits') == current_user.get('night_person'):
-                        count += 1
-                    if user_data.get('guest_preferences') == current_user.get('gatherings'):
-                        count += 1
-
-                    if count > 0:
-                        matching_users.append((username, count))
-
-            matching_users.sort(key=lambda x: x[1], reverse=True)
+            with metrics.span("roommate_match"):
+                matching_users = backend.roommate_matches(st.session_state.username)
 
             if matching_users:
                 for match, count in matching_users:
@@ -373,12 +376,8 @@ if 'username' in st.session_state:
 
                     if st.button(f"Simulate Conversation with {match}"):
                         # Load txt files for both users
-                        current_user_text = load_user_txt(st.session_state.username)
-                        matched_user_text = load_user_txt(match)
-                        current_user_profile = users[st.session_state.username]
-                        matched_user_profile = users[match]
-                        current_user_info = format_profile(current_user_profile, "User A")
-                        matched_user_info = format_profile(matched_user_profile, "User B")
+                        current_user_text = backend.style_sample(st.session_state.username)
+                        matched_user_text = backend.style_sample(match)
                     
                     # Check if txt files are not empty
                         if not current_user_text:
@@ -387,38 +386,26 @@ if 'username' in st.session_state:
                         if not matched_user_text:
                             st.error(f"No texting style data found for {match}.")
                             continue
-                        
-                        # Prepare a prompt for the language model
-                        prompt = f"""
-                                You are to simulate a text conversation between two users (you must use full names, dont use user A and user B) who are texting for the first time to discuss becoming roommates.
-
-                                Base User A's texting style off this text exchange with their friend:
-                                {current_user_text}
-
-                                use this profile info for user a:
-                                {current_user_info}
-
-                                User B's texting style texting style off this text exchange with their friend:
-                                {matched_user_text}
 
-                                use this profile info for user b:
-                                {matched_user_info}
-                                """
 
                         if "app_key" in st.session_state:
                             try:
-                                genai.configure(api_key=st.session_state.app_key)
                                 st.success("API key configured successfully.")
-                                model = genai.GenerativeModel("gemini-pro")
                                 # time.sleep(30)
-                                response = model.generate_content(prompt)
-                                st.write(response.text)
+                                timings = {}
+                                with metrics.span("gemini_roommate"):
+                                    st.write_stream(backend.stream_conversation(st.session_state.app_key, st.session_state.username, match, timings))
+                                show_llm_timing("roommate", timings)
                                 # Display the conversation
                                 # generated_conversation = response.candidates[0]['output']
                                 # st.write("Done")
                                 # st.write(generated_conversation)
                             except Exception as e:
                                 st.error(f"Error generating conversation: {e}")
+
+                if "app_key" in st.session_state:
+                    # warm the cache so the next "Simulate Conversation" click is instant
+                    backend.prefetch_conversations(st.session_state.app_key, st.session_state.username, [match for match, _ in matching_users[:ROOMMATE_PREFETCH]])
                             
             else:
                 st.write("No matching roommates found based on your preferences.")
@@ -431,18 +418,20 @@ if 'username' in st.session_state:
         issue_description = st.text_area("Describe the issue you're facing:")
         
         if st.button("Submit Issue"):
-            # Append the tech support issue to the chat history
-            st.session_state.history.append({"role": "user", "parts": [{"text": issue_description}]})
-            
-            # Generate a response from the chatbot based on the input
-            chat = model.start_chat(history=st.session_state.history)
-            full_response = chat.send_message(issue_description)
-            st.session_state.history = chat.history
-            
-            # Display the chatbot's response
-            for message in full_response:
-                with st.chat_message("assistant"):
-                    st.markdown(message['text'])
+            timings = {}
+
+            # Display the chatbot's response as it streams in
+            with st.chat_message("assistant"):
+                with metrics.span("gemini_support"):
+                    # the reply is generated from the bounded history
+                    reply = st.write_stream(backend.stream_support(st.session_state.get("app_key"), st.session_state.history.to_history(), issue_description, timings))
+
+            # Append the exchange to the chat history, older turns get folded into its summary
+            st.session_state.history.add("user", issue_description)
+            st.session_state.history.add("model", reply)
+            show_llm_timing("tech support", timings)
 
 else:
     st.write("Please log in to use the application.")
+
+metrics.finish_rerun(st.session_state.get("username"))
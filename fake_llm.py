@@ -0,0 +1,85 @@
+"""Offline stand-ins for ``genai.GenerativeModel`` used by the benchmarks."""
+import hashlib
+import threading
+import time
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStream:
+    """Iterable of chunk responses, like ``generate_content(..., stream=True)``."""
+
+    def __init__(self, text, chunk_size, first_chunk_delay, chunk_delay, on_done=None):
+        self.text = text
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.on_done = on_done
+
+    def __iter__(self):
+        for i in range(0, len(self.text), self.chunk_size):
+            time.sleep(self.first_chunk_delay if i == 0 else self.chunk_delay)
+            yield FakeResponse(self.text[i:i + self.chunk_size])
+        if self.on_done is not None:
+            self.on_done()
+
+
+class FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        prompt = '\n'.join(part['text'] for message in self.history for part in message['parts']) + '\n' + content
+        self.history.append({"role": "user", "parts": [{"text": content}]})
+        response = self.model.generate_content(prompt, stream=stream)
+
+        def record():
+            self.history.append({"role": "model", "parts": [{"text": response.text}]})
+
+        if stream:
+            response.on_done = record
+        else:
+            record()
+        return response
+
+
+class FakeGenerativeModel:
+    """Answers every prompt with a deterministic reply and counts the calls.
+
+    ``delay`` is the time a blocking call takes, plus ``prompt_delay`` per
+    1,000 prompt characters to mimic longer prompts costing more. A streamed
+    reply arrives in ``chunk_size`` pieces, the first after
+    ``first_chunk_delay`` and the rest ``chunk_delay`` apart.
+    """
+
+    def __init__(self, model_name='models/fake-gemini', delay=0.0, prompt_delay=0.0, chunk_size=40, first_chunk_delay=0.0, chunk_delay=0.0):
+        self.model_name = model_name
+        self.delay = delay
+        self.prompt_delay = prompt_delay
+        self.chunk_size = chunk_size
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+        self.calls = 0
+        self.prompt_sizes = []
+        self.lock = threading.Lock()
+
+    def reply(self, prompt):
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+        return f"[{self.model_name}] simulated reply {digest} to a {len(prompt)}-character prompt."
+
+    def generate_content(self, prompt, stream=False):
+        with self.lock:
+            self.calls += 1
+            self.prompt_sizes.append(len(prompt))
+        prompt_delay = self.prompt_delay * len(prompt) / 1000
+        if stream:
+            return FakeStream(self.reply(prompt), self.chunk_size, self.first_chunk_delay + prompt_delay, self.chunk_delay)
+        time.sleep(self.delay + prompt_delay)
+        return FakeResponse(self.reply(prompt))
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
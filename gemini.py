@@ -0,0 +1,23 @@
+import threading
+
+MODEL_NAME = "gemini-pro"
+
+lock = threading.Lock()
+
+
+def make_model(api_key, model_name=MODEL_NAME):
+    """A GenerativeModel with its own client for ``api_key``.
+
+    google.generativeai is imported here, on first use, because it is slow to
+    import. genai.configure() is process-global, so the client is created
+    right away under a lock and pinned to the model; configuring another key
+    later does not change which key this model uses.
+    """
+    import google.generativeai as genai
+    from google.generativeai import client
+
+    with lock:
+        genai.configure(api_key=api_key)
+        model = genai.GenerativeModel(model_name)
+        model._client = client.get_default_generative_client()
+    return model
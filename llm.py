@@ -0,0 +1,203 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm_cache import model_name, prompt_key
+
+
+def timed_chunks(response, start, timings):
+    """Yield the text of each streamed chunk, filling ``timings`` as it goes.
+
+    ``timings`` gets ``ttft`` (seconds from ``start`` to the first chunk) and
+    ``total`` once the stream is exhausted.
+    """
+    for chunk in response:
+        text = chunk.text
+        if 'ttft' not in timings:
+            timings['ttft'] = time.perf_counter() - start
+        yield text
+    timings.setdefault('ttft', time.perf_counter() - start)
+    timings['total'] = time.perf_counter() - start
+
+
+def transient_errors():
+    """Gemini errors worth retrying: quota, overload, timeouts and server faults.
+
+    A bad key, an invalid request or a blocked reply fails the same way every
+    time, so those are raised at once.
+    """
+    from google.api_core import exceptions
+    return (exceptions.ResourceExhausted, exceptions.ServiceUnavailable, exceptions.DeadlineExceeded, exceptions.InternalServerError)
+
+
+class RateLimiter:
+    """Token bucket: ``per_minute`` request starts, with bursts of up to ``burst``."""
+
+    def __init__(self, per_minute=None, burst=1):
+        self.rate = per_minute / 60.0 if per_minute else None
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.rate is None:
+            return
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # going negative reserves a future token for this caller
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        time.sleep(delay)
+
+
+class LLMScheduler:
+    """Process-wide gate in front of every Gemini call.
+
+    At most ``concurrency`` requests run at once and starts are rate limited.
+    Transient failures before any text arrives are retried with exponential
+    backoff (``retry_on``, transient_errors() unless given).
+    Identical (model, prompt) requests that are already in flight share one
+    call, and finished replies land in ``cache`` so later clicks return at once.
+    """
+
+    def __init__(self, cache=None, concurrency=4, requests_per_minute=None, burst=1, retries=3, backoff=1.0, max_backoff=30.0, retry_on=None):
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='llm')
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.limiter = RateLimiter(requests_per_minute, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on if retry_on is not None else transient_errors()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'merged': 0, 'retries': 0, 'failures': 0}
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def with_retries(self, fn):
+        for attempt in itertools.count():
+            self.limiter.wait()
+            self.count('requests')
+            try:
+                return fn()
+            except self.retry_on:
+                if attempt >= self.retries:
+                    self.count('failures')
+                    raise
+            self.count('retries')
+            time.sleep(min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def open_stream(self, open_response):
+        # retried until the first chunk arrives; after that a failure is final
+        def first_chunk():
+            chunks = iter(open_response())
+            return chunks, next(chunks, None)
+
+        chunks, first = self.with_retries(first_chunk)
+        return chunks if first is None else itertools.chain([first], chunks)
+
+    def stream_call(self, open_response, timings):
+        """Stream an arbitrary call (e.g. ``chat.send_message(..., stream=True)``) under the limits."""
+        start = time.perf_counter()
+        with self.slots:
+            yield from timed_chunks(self.open_stream(open_response), start, timings)
+
+    def claim(self, key):
+        # returns (future, True) if the caller must run the request itself
+        with self.lock:
+            future = self.inflight.get(key)
+            if future is not None:
+                self.stats['merged'] += 1
+                return future, False
+            future = self.inflight[key] = Future()
+            return future, True
+
+    def release(self, key):
+        with self.lock:
+            self.inflight.pop(key, None)
+
+    def cached(self, key):
+        return self.cache.get(key) if self.cache is not None else None
+
+    def run(self, model, prompt, key, future):
+        try:
+            text = self.cached(key)
+            if text is None:
+                with self.slots:
+                    text = self.with_retries(lambda: model.generate_content(prompt).text)
+                # an empty reply is most likely a blocked or failed one, don't keep it
+                if self.cache is not None and text:
+                    self.cache.put(key, text, model_name(model))
+            future.set_result(text)
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            self.release(key)
+
+    def submit(self, model, prompt):
+        """Generate in the background; returns a Future for the reply text."""
+        key = prompt_key(model_name(model), prompt)
+        future, owner = self.claim(key)
+        if owner:
+            self.pool.submit(self.run, model, prompt, key, future)
+        return future
+
+    def generate(self, model, prompt):
+        key = prompt_key(model_name(model), prompt)
+        text = self.cached(key)
+        return text if text is not None else self.submit(model, prompt).result()
+
+    def prefetch(self, model, prompts):
+        """Warm the cache for ``prompts`` without waiting for them."""
+        for prompt in prompts:
+            key = prompt_key(model_name(model), prompt)
+            if self.cache is not None and key in self.cache:
+                continue
+            self.submit(model, prompt)
+
+    def stream(self, model, prompt, timings):
+        """Stream a reply, unless it is cached or already being generated.
+
+        ``timings`` gets ``ttft``/``total`` plus ``source``: "cache", "merged"
+        (waited on an identical in-flight request) or "model".
+        """
+        start = time.perf_counter()
+        key = prompt_key(model_name(model), prompt)
+        text = self.cached(key)
+        if text is None:
+            future, owner = self.claim(key)
+            if not owner:
+                text = future.result()
+                timings['source'] = 'merged'
+        else:
+            timings['source'] = 'cache'
+        if text is not None:
+            timings.update(ttft=time.perf_counter() - start, total=time.perf_counter() - start)
+            yield text
+            return
+
+        timings['source'] = 'model'
+        chunks = []
+        try:
+            with self.slots:
+                stream = self.open_stream(lambda: model.generate_content(prompt, stream=True))
+                for chunk in timed_chunks(stream, start, timings):
+                    chunks.append(chunk)
+                    yield chunk
+            text = ''.join(chunks)
+            if self.cache is not None and text:
+                self.cache.put(key, text, model_name(model))
+            future.set_result(text)
+        except BaseException as e:
+            # anyone waiting on this prompt gets the error, not a GeneratorExit
+            future.set_exception(e if isinstance(e, Exception) else RuntimeError("LLM stream was interrupted"))
+            raise
+        finally:
+            self.release(key)
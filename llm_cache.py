@@ -0,0 +1,117 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+RESPONSES_DB = '.cache/llm_responses.sqlite'
+
+
+def model_name(model):
+    return getattr(model, 'model_name', type(model).__name__)
+
+
+def prompt_key(name, prompt):
+    # the prompt already embeds both profiles and both chat samples
+    return hashlib.sha256(f"{name}\0{prompt}".encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Generated text keyed by a hash of (model name, prompt).
+
+    Lookups go through a bounded in-memory LRU first and then an SQLite file
+    that survives restarts. Entries older than ``ttl`` seconds count as misses;
+    ``ttl=None`` keeps them forever.
+    """
+
+    def __init__(self, path=RESPONSES_DB, max_entries=256, ttl=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with self.connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, text TEXT NOT NULL, created REAL NOT NULL)"
+                )
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def remember(self, key, text, created):
+        with self.lock:
+            self.memory[key] = (text, created)
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.max_entries:
+                self.memory.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and not self.expired(entry[1]):
+                self.memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return entry[0]
+            self.memory.pop(key, None)
+
+        if self.path is not None:
+            row = self.connect().execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and not self.expired(row[1]):
+                self.remember(key, *row)
+                with self.lock:
+                    self.stats['disk_hits'] += 1
+                return row[0]
+
+        with self.lock:
+            self.stats['misses'] += 1
+        return None
+
+    def __contains__(self, key):
+        # presence check that leaves the hit/miss counters alone
+        with self.lock:
+            entry = self.memory.get(key)
+        if entry is not None and not self.expired(entry[1]):
+            return True
+        if self.path is None:
+            return False
+        row = self.connect().execute("SELECT created FROM responses WHERE key = ?", (key,)).fetchone()
+        return row is not None and not self.expired(row[0])
+
+    def put(self, key, text, name=None):
+        created = time.time()
+        self.remember(key, text, created)
+        if self.path is not None:
+            with self.connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, text, created) VALUES (?, ?, ?, ?)",
+                    (key, name, text, created),
+                )
+
+    def generate(self, model, prompt):
+        """Cached ``model.generate_content(prompt).text``."""
+        name = model_name(model)
+        key = prompt_key(name, prompt)
+        text = self.get(key)
+        if text is None:
+            text = model.generate_content(prompt).text
+            self.put(key, text, name)
+        return text
+
+    def clear_expired(self):
+        if self.ttl is None or self.path is None:
+            return 0
+        with self.connect() as conn:
+            return conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)).rowcount
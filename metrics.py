@@ -0,0 +1,225 @@
+"""Per-rerun stage timings for the Streamlit app.
+
+Off unless LEASY_METRICS=1 (or enable()); while off, span()
+hands back one shared no-op context manager and timed() calls straight
+through, so instrumented code pays a flag check and nothing else.
+cProfile traces are only taken with LEASY_PROFILE=1 (or
+enable_profiling()), and only the newest PROFILES_KEPT are kept.
+"""
+import contextlib
+import cProfile
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WINDOW = 1000
+RERUNS_KEPT = 200
+PROFILES_DIR = '.cache/profiles'
+PROFILES_KEPT = 20
+METRICS_FILE = '.cache/metrics.json'
+EXPORT_INTERVAL = 10.0
+
+enabled = os.environ.get('LEASY_METRICS', '') not in ('', '0')
+profiling = os.environ.get('LEASY_PROFILE', '') not in ('', '0')
+NOOP = contextlib.nullcontext()
+
+lock = threading.Lock()
+durations = defaultdict(lambda: deque(maxlen=WINDOW))
+reruns = deque(maxlen=RERUNS_KEPT)
+current = threading.local()
+last_export = 0.0
+server = None
+# why serve() could not bind, so later reruns don't try again
+server_error = None
+log = logging.getLogger(__name__)
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def enable_profiling(on=True):
+    global profiling
+    profiling = on
+
+
+def record(stage, seconds):
+    with lock:
+        durations[stage].append(seconds)
+    rerun = getattr(current, 'rerun', None)
+    if rerun is not None:
+        rerun['spans'].append((stage, seconds))
+
+
+@contextlib.contextmanager
+def _span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def span(stage):
+    """``with metrics.span("apartment_filter"): ...``"""
+    return _span(stage) if enabled else NOOP
+
+
+def timed(stage):
+    """Decorator form of span()."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with _span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_rerun(session_id, user=None, profile=False):
+    """Begin collecting spans for one script run on this thread.
+
+    With ``profile=True`` and profiling enabled the run is also traced with
+    cProfile, whether or not metrics are enabled, and dumped to
+    PROFILES_DIR by finish_rerun().
+    """
+    stale = getattr(current, 'rerun', None)
+    if stale is not None and stale['profiler'] is not None:
+        # the previous run on this thread stopped early (e.g. st.rerun())
+        stale['profiler'].disable()
+    current.rerun = None
+    profiler = None
+    if profile and profiling:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if enabled or profiler is not None:
+        current.rerun = {'session': session_id, 'user': user, 'started': time.time(), 'spans': [], 'start': time.perf_counter(), 'profiler': profiler}
+
+
+def finish_rerun(user=None):
+    rerun = getattr(current, 'rerun', None)
+    current.rerun = None
+    if rerun is None:
+        return None
+    total = time.perf_counter() - rerun.pop('start')
+    profiler = rerun.pop('profiler')
+    if profiler is not None:
+        profiler.disable()
+        os.makedirs(PROFILES_DIR, exist_ok=True)
+        rerun['profile'] = os.path.join(PROFILES_DIR, f"rerun-{rerun['session']}-{int(time.time() * 1000)}.prof")
+        profiler.dump_stats(rerun['profile'])
+        prune_profiles()
+    if not enabled:
+        return rerun
+    if user is not None:
+        rerun['user'] = user
+    rerun['total'] = total
+    record('rerun', total)
+    with lock:
+        reruns.append(rerun)
+    export_if_due()
+    return rerun
+
+
+def prune_profiles(keep=PROFILES_KEPT):
+    dumps = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(PROFILES_DIR) if entry.name.endswith('.prof'))
+    for _, path in dumps[:-keep]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # pruned by another session at the same time
+            pass
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summary():
+    """{stage: {count, p50, p95, p99}} over the rolling window, in seconds."""
+    with lock:
+        snapshot = {stage: list(values) for stage, values in durations.items()}
+    return {
+        stage: {'count': len(values), 'p50': percentile(values, 0.50), 'p95': percentile(values, 0.95), 'p99': percentile(values, 0.99)}
+        for stage, values in snapshot.items()
+    }
+
+
+def recent_reruns(session_id=None):
+    with lock:
+        return [dict(rerun) for rerun in reruns if session_id is None or rerun['session'] == session_id]
+
+
+def prometheus_text():
+    lines = [
+        '# HELP leasy_stage_seconds Stage duration over the last window of reruns.',
+        '# TYPE leasy_stage_seconds summary',
+    ]
+    for stage, stats in sorted(summary().items()):
+        for q in ('p50', 'p95', 'p99'):
+            lines.append(f'leasy_stage_seconds{{stage="{stage}",quantile="0.{q[1:]}"}} {stats[q]:.6f}')
+        lines.append(f'leasy_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def export(path=METRICS_FILE):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'updated': time.time(), 'stages': summary(), 'reruns': recent_reruns()[-20:]}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_if_due(path=METRICS_FILE):
+    global last_export
+    now = time.monotonic()
+    if now - last_export < EXPORT_INTERVAL:
+        return
+    last_export = now
+    export(path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port):
+    """Expose /metrics on ``port`` from a daemon thread; safe to call on every rerun.
+
+    If the port can't be bound this logs a warning once and returns None.
+    """
+    global server, server_error
+    with lock:
+        if server is not None or server_error is not None:
+            return server
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+        except OSError as e:
+            server_error = e
+            log.warning("metrics: could not serve /metrics on port %s: %s", port, e)
+            return None
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
@@ -0,0 +1,34 @@
+def format_profile(user_profile, user_label):
+    profile_info = f"""
+                    {user_label}'s Profile:
+                    - Full Name: {user_profile.get('full_name', 'N/A')}
+                    - Age: {user_profile.get('age', 'N/A')}
+                    - Gender: {user_profile.get('gender', 'N/A')}
+                    - College: {user_profile.get('college', 'N/A')}
+                    - Major: {user_profile.get('major', 'N/A')}
+                    - School Year: {user_profile.get('school_year', 'N/A')}
+                    - Smoking Habits: {user_profile.get('smoking_habits', 'N/A')}
+                    - Sleeping Habits: {user_profile.get('sleeping_habits', 'N/A')}
+                    - Guest Preferences: {user_profile.get('guest_preferences', 'N/A')}
+                    - Has Pet: {'Yes' if user_profile.get('has_pet') else 'No'}
+                    - Bio: {user_profile.get('bio', 'N/A')}
+                    """
+    return profile_info
+
+def build_conversation_prompt(current_user_text, current_user_info, matched_user_text, matched_user_info):
+    prompt = f"""
+                                You are to simulate a text conversation between two users (you must use full names, dont use user A and user B) who are texting for the first time to discuss becoming roommates.
+
+                                Base User A's texting style off these notes and sample messages from their chats with a friend:
+                                {current_user_text}
+
+                                use this profile info for user a:
+                                {current_user_info}
+
+                                Base User B's texting style off these notes and sample messages from their chats with a friend:
+                                {matched_user_text}
+
+                                use this profile info for user b:
+                                {matched_user_info}
+                                """
+    return prompt
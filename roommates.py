@@ -0,0 +1,349 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import closing
+
+import numpy as np
+
+MATCHES_DB = '.cache/roommate_matches.sqlite'
+
+# (candidate profile field, current user's roommate preference field)
+MATCH_FIELDS = [
+    ('smoking_habits', 'roommate_smoking'),
+    ('has_pet', 'roommate_has_pets'),
+    ('school_year', 'roommate_year'),
+    ('sleeping_habits', 'night_person'),
+    ('guest_preferences', 'gatherings'),
+]
+
+
+def is_looking(user_data):
+    return user_data.get('looking_for_roommate') == "Yes"
+
+
+def match_count(current_user, user_data):
+    count = 0
+    for field, preference in MATCH_FIELDS:
+        if user_data.get(field) == current_user.get(preference):
+            count += 1
+    return count
+
+
+def match_users_loop(users, username):
+    # the original per-candidate loop, kept as the reference for RoommateMatcher
+    current_user = users[username]
+    matching_users = []
+    for other, user_data in users.items():
+        if other != username and is_looking(user_data):
+            count = match_count(current_user, user_data)
+            if count > 0:
+                matching_users.append((other, count))
+    matching_users.sort(key=lambda x: x[1], reverse=True)
+    return matching_users
+
+
+class RoommateMatcher:
+    """Integer-coded profile columns for every user looking for a roommate.
+
+    Each match field is encoded against its own vocabulary, so a candidate
+    scores a point exactly when ``user_data.get(field) == current_user.get(pref)``
+    as in match_count. Scores for all candidates come from one vectorized pass.
+    """
+
+    def __init__(self, users):
+        looking = [(username, user_data) for username, user_data in users.items() if is_looking(user_data)]
+        self.usernames = [username for username, _ in looking]
+        self.positions = {username: i for i, username in enumerate(self.usernames)}
+        self.vocab = {}
+        self.codes = {}
+        for field, _ in MATCH_FIELDS:
+            vocab = {}
+            codes = np.fromiter(
+                (vocab.setdefault(user_data.get(field), len(vocab)) for _, user_data in looking),
+                dtype=np.int32,
+                count=len(looking),
+            )
+            self.vocab[field] = vocab
+            self.codes[field] = codes
+        self.preferences = {}
+        for _, preference in MATCH_FIELDS:
+            values = np.empty(len(looking), dtype=object)
+            values[:] = [user_data.get(preference) for _, user_data in looking]
+            self.preferences[preference] = values
+
+    def __len__(self):
+        return len(self.usernames)
+
+    def with_user(self, username, user_data):
+        """A copy with ``username``'s profile replaced, added or dropped.
+
+        Users keep their positions; a user not in the matcher yet is appended,
+        so this is only equivalent to a rebuild when they are also the newest
+        sign-up. ``user_data=None`` drops the user.
+        """
+        looking = user_data is not None and is_looking(user_data)
+        position = self.positions.get(username)
+        if position is None and not looking:
+            return self
+        matcher = copy.copy(self)
+        if not looking:
+            matcher.usernames = self.usernames[:position] + self.usernames[position + 1:]
+            matcher.codes = {field: np.delete(codes, position) for field, codes in self.codes.items()}
+            matcher.preferences = {preference: np.delete(values, position) for preference, values in self.preferences.items()}
+            matcher.positions = {other: i for i, other in enumerate(matcher.usernames)}
+            return matcher
+        if position is None:
+            position = len(self)
+            matcher.usernames = self.usernames + [username]
+            matcher.positions = {**self.positions, username: position}
+            matcher.codes = {field: np.append(codes, np.int32(0)) for field, codes in self.codes.items()}
+            matcher.preferences = {preference: np.append(values, None) for preference, values in self.preferences.items()}
+        else:
+            matcher.codes = {field: codes.copy() for field, codes in self.codes.items()}
+            matcher.preferences = {preference: values.copy() for preference, values in self.preferences.items()}
+        matcher.vocab = {}
+        for field, _ in MATCH_FIELDS:
+            vocab = self.vocab[field]
+            if user_data.get(field) not in vocab:
+                vocab = {**vocab, user_data.get(field): len(vocab)}
+            matcher.vocab[field] = vocab
+            matcher.codes[field][position] = vocab[user_data.get(field)]
+        for _, preference in MATCH_FIELDS:
+            matcher.preferences[preference][position] = user_data.get(preference)
+        return matcher
+
+    def scores(self, current_user):
+        scores = np.zeros(len(self), dtype=np.int8)
+        for field, preference in MATCH_FIELDS:
+            code = self.vocab[field].get(current_user.get(preference), -1)
+            if code >= 0:
+                scores += self.codes[field] == code
+        return scores
+
+    def preferences_of(self, username):
+        i = self.positions[username]
+        return {preference: values[i] for preference, values in self.preferences.items()}
+
+    def reverse_scores(self, user_data):
+        # how every candidate would score ``user_data`` as their own roommate
+        scores = np.zeros(len(self), dtype=np.int8)
+        for field, preference in MATCH_FIELDS:
+            scores += self.preferences[preference] == user_data.get(field)
+        return scores
+
+    def top_matches(self, username, current_user, k=None):
+        """Best ``k`` (username, count) pairs in the same order as match_users_loop."""
+        scores = self.scores(current_user)
+        position = self.positions.get(username)
+        if position is not None:
+            scores[position] = 0
+
+        candidates = np.flatnonzero(scores > 0)
+        if k is not None and len(candidates) > k:
+            part = np.argpartition(-scores[candidates], k - 1)[:k]
+            threshold = scores[candidates[part]].min()
+            above = candidates[scores[candidates] > threshold]
+            # ties at the cut-off go to the earliest users, like a stable sort
+            tied = candidates[scores[candidates] == threshold][:k - len(above)]
+            candidates = np.concatenate([above, tied])
+
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [(self.usernames[i], int(scores[i])) for i in candidates[order]]
+
+
+class MatchTable:
+    """Top-k roommate matches for every user, persisted in SQLite.
+
+    The whole table is kept in memory and written through row by row, so a
+    sign-up or profile edit only rewrites the lists it actually changes.
+    ``version`` is an opaque marker of the users data the table reflects.
+    Every save stamps its rows with the next ``serial``, which lets another
+    process sharing the file pick up just those rows (see refresh).
+    """
+
+    def __init__(self, path=MATCHES_DB, k=10):
+        self.path = path
+        self.k = k
+        self.lock = threading.Lock()
+        self.matches = {}
+        self.owners = defaultdict(set)
+        self.version = None
+        self.serial = 0
+        # changes on every rebuild, when serials start over
+        self.generation = None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.load()
+
+    def connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def load(self):
+        with self.connect() as conn, conn:
+            if conn.execute("SELECT 1 FROM pragma_table_info('matches')").fetchone() and not conn.execute(
+                "SELECT 1 FROM pragma_table_info('matches') WHERE name = 'serial'"
+            ).fetchone():
+                # written before rows had serials, start over
+                conn.execute("DROP TABLE matches")
+                conn.execute("DROP TABLE IF EXISTS meta")
+            # a removed list stays behind as entries 'null' so other processes see it go
+            conn.execute("CREATE TABLE IF NOT EXISTS matches (username TEXT PRIMARY KEY, entries TEXT NOT NULL, serial INTEGER NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS matches_serial ON matches (serial)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get('k') != str(self.k):
+                # built for a different k, treat as empty so the caller rebuilds
+                return
+            self.version = meta.get('version')
+            self.serial = int(meta.get('serial', 0))
+            self.generation = meta.get('generation')
+            for username, entries in conn.execute("SELECT username, entries FROM matches WHERE entries != 'null'"):
+                self.set_list(username, [tuple(entry) for entry in json.loads(entries)])
+
+    def refresh(self):
+        """Catch up with saves made by other processes since this table last loaded or saved."""
+        with self.connect() as conn:
+            # one read transaction, so the rows and meta agree
+            conn.execute("BEGIN")
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            with self.lock:
+                if meta.get('k') != str(self.k) or meta.get('generation') != self.generation:
+                    # rebuilt elsewhere (or never built), read it all again
+                    self.matches = {}
+                    self.owners = defaultdict(set)
+                    self.version = None
+                    self.serial = 0
+                    self.generation = None
+                    conn.rollback()
+                    self.load()
+                    return
+                for username, entries in conn.execute("SELECT username, entries FROM matches WHERE serial > ?", (self.serial,)):
+                    self.set_list(username, [tuple(entry) for entry in json.loads(entries)] if entries != 'null' else None)
+                self.version = meta.get('version')
+                self.serial = int(meta.get('serial', 0))
+            conn.rollback()
+
+    def save(self, usernames, reset=False):
+        with self.connect() as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if reset:
+                conn.execute("DELETE FROM matches")
+                self.generation = uuid.uuid4().hex
+                stored = self.serial = 0
+            else:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'serial'").fetchone()
+                stored = int(row[0]) if row else 0
+            serial = stored + 1
+            if stored == self.serial:
+                # otherwise other processes' rows in between are still to be read
+                self.serial = serial
+            rows = [(username, json.dumps(self.matches[username]) if username in self.matches else 'null', serial) for username in usernames]
+            conn.executemany("INSERT OR REPLACE INTO matches (username, entries, serial) VALUES (?, ?, ?)", rows)
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [('k', str(self.k)), ('version', self.version), ('serial', str(serial)), ('generation', self.generation)],
+            )
+
+    def get(self, username):
+        return list(self.matches.get(username, []))
+
+    def set_list(self, username, entries):
+        for other, _ in self.matches.get(username, []):
+            self.owners[other].discard(username)
+        if entries is None:
+            self.matches.pop(username, None)
+            return
+        self.matches[username] = entries
+        for other, _ in entries:
+            self.owners[other].add(username)
+
+    def compute_all(self, matcher):
+        return {
+            username: matcher.top_matches(username, matcher.preferences_of(username), self.k)
+            for username in matcher.usernames
+        }
+
+    def build(self, matcher, version=None):
+        with self.lock:
+            self.matches = {}
+            self.owners = defaultdict(set)
+            for username, entries in self.compute_all(matcher).items():
+                self.set_list(username, entries)
+            self.version = version
+            self.save(set(self.matches), reset=True)
+
+    def update_user(self, username, user_data, matcher, version=None):
+        """Bring the table up to date after ``username`` signed up or changed.
+
+        ``user_data`` is the saved profile (None if the user is gone) and
+        ``matcher`` must already include it. Only ``username``'s own list and
+        the lists ``username`` enters or leaves are recomputed.
+        """
+        with self.lock:
+            looking = user_data is not None and is_looking(user_data)
+            changed = {username}
+            self.set_list(username, matcher.top_matches(username, user_data, self.k) if looking else None)
+
+            if looking:
+                position = matcher.positions[username]
+                reverse = matcher.reverse_scores(user_data)
+
+            def rank(entry):
+                return -entry[1], matcher.positions[entry[0]]
+
+            previous_owners = set(self.owners.get(username, ()))
+            for owner in previous_owners:
+                entries = self.matches[owner]
+                rest = [entry for entry in entries if entry[0] != username]
+                score = int(reverse[matcher.positions[owner]]) if looking and owner in matcher.positions else 0
+                if score > 0 and (len(entries) < self.k or (-score, position) <= rank(entries[-1])):
+                    rest = sorted(rest + [(username, score)], key=rank)
+                elif len(entries) == self.k:
+                    # left or slid down a full list, the next best candidate is unknown
+                    rest = matcher.top_matches(owner, matcher.preferences_of(owner), self.k)
+                self.set_list(owner, rest)
+                changed.add(owner)
+
+            if looking:
+                for i in np.flatnonzero(reverse > 0):
+                    owner = matcher.usernames[i]
+                    if owner == username or owner in previous_owners or owner not in self.matches:
+                        continue
+                    entries = self.matches[owner]
+                    if len(entries) < self.k or (-int(reverse[i]), position) < rank(entries[-1]):
+                        entries = sorted(entries + [(username, int(reverse[i]))], key=rank)[:self.k]
+                        self.set_list(owner, entries)
+                        changed.add(owner)
+
+            self.version = version
+            self.save(changed)
+
+    def verify(self, matcher):
+        """Usernames whose stored list differs from a fresh rebuild."""
+        fresh = self.compute_all(matcher)
+        return sorted(
+            username for username in set(fresh) | set(self.matches)
+            if [tuple(entry) for entry in self.matches.get(username, [])] != fresh.get(username)
+        )
+
+
+if __name__ == '__main__':
+    # consistency check: python roommates.py [users.sqlite | users.json] [--rebuild]
+    import sys
+
+    from user_store import open_user_store
+
+    args = [arg for arg in sys.argv[1:] if arg != '--rebuild']
+    users = open_user_store(args[0]) if args else open_user_store()
+    table = MatchTable()
+    matcher = RoommateMatcher(users.find(looking_for_roommate="Yes"))
+    mismatched = table.verify(matcher)
+    print(f"{len(mismatched)} of {len(matcher)} match lists differ from a fresh rebuild")
+    for username in mismatched[:20]:
+        print(f"  {username}")
+    if mismatched and '--rebuild' in sys.argv:
+        table.build(matcher, table.version)
+        print("rebuilt")
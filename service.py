@@ -0,0 +1,391 @@
+"""The app's core operations without Streamlit.
+
+demo.py calls these in-process (or through api_client.ApiClient) and api.py
+serves them over HTTP. Resources are created on first use and shared by
+every thread of the process; state that several worker processes must
+agree on lives in the SQLite user store, and the match table and response
+cache are kept in SQLite next to it.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import chat_history
+import chat_logs
+import chat_samples
+import gemini
+import llm
+import llm_cache
+import metrics
+import user_store
+from prompts import build_conversation_prompt, format_profile
+
+USERS_FILE = 'users.json'
+APARTMENTS_FILE = 'Apartment_DB.xlsx'
+TXT_DIR = 'txt'
+
+ROOMMATE_MATCHES_SHOWN = 10
+PAGE_SIZE = 20
+MAP_ZOOM = 12
+RANKINGS_KEPT = 64
+# map viewports kept per ranking; zoom and bounds come from the client
+CLUSTERS_KEPT = 8
+MODELS_KEPT = 32
+STYLE_SAMPLES_KEPT = 256
+
+LLM_CONCURRENCY = 4
+LLM_REQUESTS_PER_MINUTE = 60
+
+# never sent back to a client
+PRIVATE_FIELDS = ['password']
+# digest of the user's stored chat log, set by save_chat_log rather than profile edits
+CHAT_LOG_FIELD = 'chat_log'
+
+
+class MissingStyleData(LookupError):
+    """A user in a simulated conversation has no uploaded chat log."""
+
+
+def public_profile(user_data):
+    return {field: value for field, value in user_data.items() if field not in PRIVATE_FIELDS}
+
+
+class LeasyService:
+    """Apartment search, roommate matching, profiles and Gemini calls for one process.
+
+    ``make_model(api_key)`` builds a Gemini model (gemini.make_model unless
+    given, e.g. a FakeGenerativeModel for load tests) and
+    ``llm_requests_per_minute=None`` turns off rate limiting. Chat log uploads
+    over ``max_upload_bytes`` are rejected. Style samples, the match table
+    and the response cache go in ``styles_dir``, ``matches_db`` and
+    ``responses_db``. pandas, numpy and
+    google.generativeai are only imported once an operation needs them.
+    """
+
+    def __init__(self, users_db=user_store.USERS_DB, users_file=USERS_FILE, apartments_file=APARTMENTS_FILE, txt_dir=TXT_DIR, styles_dir=chat_samples.STYLES_DIR, matches_db=None, responses_db=llm_cache.RESPONSES_DB, make_model=None, llm_requests_per_minute=LLM_REQUESTS_PER_MINUTE, max_upload_bytes=chat_logs.MAX_UPLOAD_BYTES):
+        self.users_db = users_db
+        self.users_file = users_file
+        self.apartments_file = apartments_file
+        self.txt_dir = txt_dir
+        self.styles_dir = styles_dir
+        # roommates.MATCHES_DB unless given; roommates pulls in numpy, so it isn't imported here
+        self.matches_db = matches_db
+        self.responses_db = responses_db
+        self.make_model = make_model
+        self.llm_requests_per_minute = llm_requests_per_minute
+        self.lock = threading.Lock()
+        # slow builds get their own locks so they don't hold up everything else
+        self.index_lock = threading.Lock()
+        # a profile write and its match table update happen together, so a
+        # lookup in between never sees the table one version behind
+        self.matches_lock = threading.Lock()
+        self.resources = {}
+        self.index = None
+        self.index_signature = None
+        self.rankings = OrderedDict()
+        self.matcher = None
+        self.matcher_signature = None
+        self.models = OrderedDict()
+        self.chat_logs = chat_logs.ChatLogStore(txt_dir, max_bytes=max_upload_bytes)
+        self.style_samples = OrderedDict()
+
+    def resource(self, name, create):
+        with self.lock:
+            if name not in self.resources:
+                self.resources[name] = create()
+            return self.resources[name]
+
+    # profiles
+
+    def store(self):
+        def create():
+            store = user_store.open_user_store(self.users_db)
+            if len(store) == 0:
+                # first start on this machine, seed the store from the bundled users.json
+                user_store.migrate_json(self.users_file, store)
+            return store
+        return self.resource('store', create)
+
+    @metrics.timed("load_users")
+    def load_users(self):
+        return self.store()
+
+    @metrics.timed("load_users")
+    def get_user(self, username):
+        user_data = self.store().get(username)
+        return public_profile(user_data) if user_data is not None else None
+
+    @metrics.timed("load_users")
+    def login(self, username, password):
+        user_data = self.store().get(username)
+        return user_data is not None and user_data.get('password') == password
+
+    def save_user(self, username, user_data, created=False):
+        """Write a profile; with ``created``, only if the username is free. Returns None if it was taken."""
+        store = self.store()
+        write = store.insert if created else store.upsert
+        with self.matches_lock:
+            # inside the write, so other workers never see the new profile
+            # before the match table that includes it
+            return write(username, user_data, lambda before, after: self.update_roommate_matches(username, user_data, created, before, after))
+
+    def change_user(self, username, change):
+        """Apply ``change(user_data)`` to a stored profile in one store transaction; returns it, or None if there is none."""
+        changed = []
+
+        def apply(user_data):
+            change(user_data)
+            changed.append(user_data)
+
+        with self.matches_lock:
+            return self.store().update(username, apply, lambda before, after: self.update_roommate_matches(username, changed[0], False, before, after))
+
+    def create_user(self, username, user_data):
+        """False if ``username`` is taken; ValueError if the profile names a chat log that isn't stored."""
+        digest = user_data.get(CHAT_LOG_FIELD)
+        if digest is not None and digest not in self.chat_logs:
+            raise ValueError(f"no stored chat log {digest!r}")
+        # the check and the insert are one transaction, so of two sign-ups for one name only one wins
+        if self.save_user(username, user_data, created=True) is None:
+            return False
+        if digest is not None:
+            self.preprocess_chat_log(username, user_data)
+        return True
+
+    def update_user(self, username, changes):
+        """Merge ``changes`` into a stored profile; returns the public profile, or None if there is none."""
+        changes = {field: value for field, value in changes.items() if field != CHAT_LOG_FIELD}
+        user_data = self.change_user(username, lambda user_data: user_data.update(changes))
+        return public_profile(user_data) if user_data is not None else None
+
+    def profile_text(self, username, label):
+        user_data = self.store().get(username)
+        return format_profile(user_data, label) if user_data is not None else None
+
+    # chat logs and prompts
+
+    def store_chat_log(self, data):
+        """Store an upload (bytes, a binary file or byte chunks) and return its digest.
+
+        Identical uploads are stored once. Raises chat_logs.UploadTooLarge
+        past ``max_upload_bytes``.
+        """
+        return self.chat_logs.put(data)
+
+    def save_chat_log(self, username, data):
+        """Store an upload as ``username``'s chat log; returns its digest, or None if there is no such user."""
+        if username not in self.store():
+            return None
+        digest = self.store_chat_log(data)
+        # only the digest is written, so edits made during a slow upload are kept
+        user_data = self.change_user(username, lambda user_data: user_data.update({CHAT_LOG_FIELD: digest}))
+        if user_data is None:
+            return None
+        self.preprocess_chat_log(username, user_data)
+        return digest
+
+    def preprocess_chat_log(self, username, user_data):
+        # once at upload time, so the first simulated conversation doesn't pay for it
+        digest = user_data[CHAT_LOG_FIELD]
+        full_name = user_data.get('full_name', '')
+        sample = chat_samples.save_style_sample(self.chat_logs.path(digest), username, full_name, styles_dir=self.styles_dir, text=self.chat_logs.text(digest))
+        self.remember_style_sample((digest, username, full_name), sample)
+
+    def remember_style_sample(self, key, sample):
+        with self.lock:
+            self.style_samples[key] = sample
+            while len(self.style_samples) > STYLE_SAMPLES_KEPT:
+                self.style_samples.popitem(last=False)
+
+    def style_sample(self, username):
+        # the preprocessed texting-style sample, not the raw upload
+        user_data = self.store().get(username) or {}
+        full_name = user_data.get('full_name', '')
+        digest = user_data.get(CHAT_LOG_FIELD)
+        if digest is None:
+            # uploaded before logs were stored by content
+            txt_path = os.path.join(self.txt_dir, f"{username}.txt")
+            if not os.path.exists(txt_path):
+                return ""
+            return chat_samples.load_style_sample(txt_path, username, full_name, styles_dir=self.styles_dir)
+
+        # stored logs never change, so the digest alone says the sample is current
+        key = (digest, username, full_name)
+        with self.lock:
+            sample = self.style_samples.pop(key, None)
+        if sample is None:
+            if digest not in self.chat_logs:
+                return ""
+            sample = chat_samples.load_style_sample(self.chat_logs.path(digest), username, full_name, styles_dir=self.styles_dir, read_text=lambda: self.chat_logs.text(digest))
+        self.remember_style_sample(key, sample)
+        return sample
+
+    def conversation_prompt(self, username, match):
+        current_user_text = self.style_sample(username)
+        matched_user_text = self.style_sample(match)
+        if not current_user_text or not matched_user_text:
+            return None
+        return build_conversation_prompt(current_user_text, self.profile_text(username, "User A"), matched_user_text, self.profile_text(match, "User B"))
+
+    # apartments
+
+    @metrics.timed("apartment_load")
+    def apartment_index(self):
+        import apartments
+        signature = apartments.source_signature(self.apartments_file)
+        with self.index_lock:
+            # an edited workbook gets reloaded
+            if signature != self.index_signature:
+                with metrics.span("excel_load"):
+                    df = apartments.load_apartment_data(self.apartments_file)
+                self.index = apartments.ApartmentIndex(df)
+                self.index_signature = signature
+                with self.lock:
+                    self.rankings.clear()
+            return self.index
+
+    def ranked(self, index, query):
+        # ranked once per preference tuple, so fetching page N never re-sorts
+        with self.lock:
+            entry = self.rankings.pop(query, None)
+        if entry is None:
+            entry = {'ranked': index.rank(*query), 'clusters': OrderedDict()}
+        with self.lock:
+            self.rankings[query] = entry
+            while len(self.rankings) > RANKINGS_KEPT:
+                self.rankings.popitem(last=False)
+        return entry
+
+    def search_apartments(self, price_range, num_bedrooms, allow_pets=False, need_parking=False, need_gym=False, page=1, page_size=PAGE_SIZE, zoom=MAP_ZOOM, bounds=None):
+        """One page of ranked listings plus map clusters for the whole result, as JSON-ready dicts.
+
+        ``bounds`` is an optional (south, west, north, east) map viewport.
+        """
+        page, page_size = int(page), int(page_size)
+        if page < 1 or page_size < 1:
+            raise ValueError("page and page_size must be at least 1")
+        index = self.apartment_index()
+        query = (tuple(price_range), tuple(num_bedrooms), bool(allow_pets), bool(need_parking), bool(need_gym))
+        entry = self.ranked(index, query)
+        ranked = entry['ranked']
+        page = min(page, ranked.page_count(page_size))
+        result = {
+            'total': len(ranked),
+            'page': page,
+            'pages': ranked.page_count(page_size),
+            # to_json turns NaN/NA into null and numpy scalars into plain numbers
+            'listings': json.loads(ranked.page(page - 1, page_size).to_json(orient='split')),
+            'has_coordinates': index.spatial is not None,
+        }
+        cluster_key = (zoom, tuple(bounds) if bounds is not None else None)
+        with self.lock:
+            clusters = entry['clusters'].get(cluster_key)
+            if clusters is not None:
+                entry['clusters'].move_to_end(cluster_key)
+        if clusters is None:
+            with metrics.span("map_clusters"):
+                clusters = json.loads(index.map_clusters(ranked.rows, zoom, bounds).to_json(orient='records'))
+            with self.lock:
+                entry['clusters'][cluster_key] = clusters
+                while len(entry['clusters']) > CLUSTERS_KEPT:
+                    entry['clusters'].popitem(last=False)
+        result['clusters'] = clusters
+        return result
+
+    # roommates
+
+    def roommate_matcher(self, signature, change=None):
+        """The matcher for store version ``signature``; callers hold matches_lock.
+
+        ``change`` is (version before, username, profile, created) for a write
+        this process just made, which spares a rebuild if the matcher was
+        current before it. A user who existed but only now looks for a
+        roommate belongs at their sign-up position, not the end.
+        """
+        import roommates
+        if signature != self.matcher_signature:
+            matcher = None
+            if change is not None and self.matcher is not None:
+                before, username, user_data, created = change
+                if before == self.matcher_signature and (created or username in self.matcher.positions or not roommates.is_looking(user_data)):
+                    matcher = self.matcher.with_user(username, user_data)
+            self.matcher = matcher or roommates.RoommateMatcher(self.store().find(looking_for_roommate="Yes"))
+            self.matcher_signature = signature
+        return self.matcher
+
+    def stored_match_table(self, version):
+        """The match table, caught up with what other worker processes saved if it isn't at ``version``."""
+        import roommates
+        table = self.resource('match_table', lambda: roommates.MatchTable(self.matches_db or roommates.MATCHES_DB, k=ROOMMATE_MATCHES_SHOWN))
+        if table.version != version:
+            table.refresh()
+        return table
+
+    def match_table(self):
+        table = self.resources.get('match_table')
+        if table is not None and table.version == self.store().version():
+            return table
+        with self.matches_lock:
+            signature = self.store().version()
+            table = self.stored_match_table(signature)
+            if table.version != signature:
+                # profiles were changed outside the app (or the table is new), start over
+                table.build(self.roommate_matcher(signature), signature)
+            return table
+
+    def update_roommate_matches(self, username, user_data, created, before, after):
+        # ``before``/``after`` bracket exactly this write, so an incremental
+        # update is only safe if the table reflects ``before``
+        table = self.stored_match_table(before)
+        if table.version == after:
+            return
+        matcher = self.roommate_matcher(after, (before, username, user_data, created))
+        if table.version == before:
+            table.update_user(username, user_data, matcher, after)
+        else:
+            table.build(matcher, after)
+
+    def roommate_matches(self, username):
+        return [list(entry) for entry in self.match_table().get(username)]
+
+    # Gemini
+
+    def model(self, api_key):
+        # one client per API key for the whole process, not one per request
+        with self.lock:
+            model = self.models.pop(api_key, None)
+        if model is None:
+            model = (self.make_model or gemini.make_model)(api_key)
+        with self.lock:
+            self.models[api_key] = model
+            while len(self.models) > MODELS_KEPT:
+                self.models.popitem(last=False)
+        return model
+
+    def scheduler(self):
+        return self.resource('scheduler', lambda: llm.LLMScheduler(
+            llm_cache.ResponseCache(self.responses_db), concurrency=LLM_CONCURRENCY, requests_per_minute=self.llm_requests_per_minute, burst=LLM_CONCURRENCY,
+        ))
+
+    def stream_conversation(self, api_key, username, match, timings):
+        """Stream a simulated conversation; raises MissingStyleData if either user has no chat log."""
+        prompt = self.conversation_prompt(username, match)
+        if prompt is None:
+            raise MissingStyleData(f"No texting style data found for {username if not self.style_sample(username) else match}.")
+        return self.scheduler().stream(self.model(api_key), prompt, timings)
+
+    def prefetch_conversations(self, api_key, username, matches):
+        # warm the cache so the next "Simulate Conversation" click is instant
+        prompts = [self.conversation_prompt(username, match) for match in matches]
+        self.scheduler().prefetch(self.model(api_key), [prompt for prompt in prompts if prompt])
+
+    def stream_support(self, api_key, history, issue, timings):
+        """Stream a tech-support reply given Gemini ``history`` messages (see ChatHistory.to_history).
+
+        ``history`` goes through ChatHistory again, so however much a client
+        sends, Gemini gets no more than its token ceiling.
+        """
+        history = chat_history.ChatHistory.from_history(history).to_history()
+        chat = self.model(api_key).start_chat(history=history)
+        return self.scheduler().stream_call(lambda: chat.send_message(issue, stream=True), timings)
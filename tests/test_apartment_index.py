@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+import apartments
+from benchmarks.bench_apartment_query import random_queries
+from benchmarks.synthetic import make_apartments
+
+
+@pytest.mark.parametrize('n, seed', [(0, 0), (1, 1), (50, 2), (500, 3)])
+def test_query_matches_full_scan(n, seed):
+    df = apartments.normalize_apartments(make_apartments(n, seed))
+    index = apartments.ApartmentIndex(df)
+    for query in random_queries(np.random.default_rng(seed), 200):
+        assert index.query(*query).index.equals(apartments.filter_apartments(df, *query).index), query
+
+
+def test_query_bounds_are_inclusive():
+    df = apartments.normalize_apartments(make_apartments(200, seed=4))
+    index = apartments.ApartmentIndex(df)
+    cost, beds = df['Cost'].iloc[0], df['Bedrooms'].iloc[0]
+    rows = index.query_rows((cost, cost), (beds, beds))
+    assert 0 in rows
+    assert (df['Cost'].iloc[rows] == cost).all() and (df['Bedrooms'].iloc[rows] == beds).all()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import apartments
+from benchmarks.bench_apartment_query import random_queries
+from benchmarks.synthetic import make_apartments
+
+PAGE_SIZE = 7
+
+
+def check_ranked(df, query):
+    index = apartments.ApartmentIndex(df)
+    expected = apartments.filter_apartments(df, *query)
+    ranked = index.rank(*query)
+    assert np.array_equal(np.sort(ranked.rows), expected.index.to_numpy()), query
+    assert len(ranked) == len(expected)
+    pages = [ranked.page(number, PAGE_SIZE) for number in range(ranked.page_count(PAGE_SIZE))]
+    assert sum(len(page) for page in pages) == len(expected)
+    assert [i for page in pages for i in page.index] == df.index[ranked.rows].tolist()
+
+
+@pytest.mark.parametrize('n, seed', [(1, 0), (40, 1), (300, 2)])
+def test_ranked_set_equals_filtered_set(n, seed):
+    df = apartments.normalize_apartments(make_apartments(n, seed))
+    for query in random_queries(np.random.default_rng(seed), 100):
+        check_ranked(df, query)
+
+
+def test_empty_frame():
+    df = apartments.normalize_apartments(make_apartments(0))
+    ranked = apartments.ApartmentIndex(df).rank((500, 3000), (1, 6))
+    assert len(ranked) == 0
+    assert ranked.page_count(PAGE_SIZE) == 1
+    assert ranked.page(0, PAGE_SIZE).empty
+
+
+def test_no_matches():
+    df = apartments.normalize_apartments(make_apartments(100, seed=3))
+    check_ranked(df, ((0, 10), (1, 6), False, False, False))
+
+
+def test_nan_coordinates():
+    raw = make_apartments(200, seed=4)
+    raw.loc[::3, 'Latitude'] = np.nan
+    raw.loc[::5, 'Longitude'] = np.nan
+    df = apartments.normalize_apartments(raw)
+    for query in random_queries(np.random.default_rng(4), 100):
+        check_ranked(df, query)
+
+    index = apartments.ApartmentIndex(df)
+    rows = index.query_rows((500, 3200), (1, 6))
+    clusters = index.map_clusters(rows, zoom=12)
+    mapped = df.iloc[rows][['Latitude', 'Longitude']].notna().all(axis=1).sum()
+    assert clusters['count'].sum() == mapped
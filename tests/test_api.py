@@ -0,0 +1,124 @@
+import os
+
+import pytest
+from starlette.testclient import TestClient
+
+import api
+import chat_history
+from fake_llm import FakeGenerativeModel
+from service import LeasyService
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TOKEN = 'test-token'
+PROFILE = {'password': "pw", 'full_name': "Amy Doe", 'looking_for_roommate': "Yes", 'school_year': "Junior"}
+
+
+@pytest.fixture
+def model():
+    return FakeGenerativeModel()
+
+
+@pytest.fixture
+def client(tmp_path, model):
+    service = LeasyService(
+        users_db=str(tmp_path / 'users.sqlite'), users_file=str(tmp_path / 'users.json'),
+        apartments_file=os.path.join(ROOT, 'Apartment_DB.xlsx'), txt_dir=str(tmp_path / 'txt'),
+        styles_dir=str(tmp_path / 'styles'), matches_db=str(tmp_path / 'matches.sqlite'), responses_db=str(tmp_path / 'responses.sqlite'),
+        make_model=lambda api_key: model, llm_requests_per_minute=None,
+    )
+    with TestClient(api.create_app(service, TOKEN)) as client:
+        yield client
+
+
+def with_token(**headers):
+    return {api.TOKEN_HEADER: TOKEN, **headers}
+
+
+def sign_up(client, username='amy', profile=PROFILE):
+    return client.post(f"/users/{username}", json=profile, headers=with_token())
+
+
+def test_sign_up_needs_the_service_token(client):
+    assert client.post("/users/amy", json=PROFILE).status_code == 401
+    assert client.post("/users/amy", json=PROFILE, headers={api.TOKEN_HEADER: "wrong"}).status_code == 401
+    assert client.get("/users/amy").status_code == 404
+
+    assert sign_up(client).status_code == 201
+    assert sign_up(client).status_code == 409
+    profile = client.get("/users/amy").json()
+    assert profile['full_name'] == "Amy Doe" and 'password' not in profile
+
+
+def test_login(client):
+    sign_up(client)
+    assert client.post("/login", json={'username': "amy", 'password': "pw"}).json() == {'ok': True}
+    assert client.post("/login", json={'username': "amy", 'password': "nope"}).json() == {'ok': False}
+
+
+def test_patch_takes_the_token_or_the_users_password(client):
+    sign_up(client)
+    sign_up(client, 'bob', dict(PROFILE, password="bobs"))
+
+    assert client.patch("/users/amy", json={'major': "CS"}).status_code == 401
+    assert client.patch("/users/amy", json={'major': "CS"}, headers={api.PASSWORD_HEADER: "nope"}).status_code == 401
+    # another user's password is no good
+    assert client.patch("/users/amy", json={'major': "CS"}, headers={api.PASSWORD_HEADER: "bobs"}).status_code == 401
+    assert client.get("/users/amy").json().get('major') is None
+
+    reply = client.patch("/users/amy", json={'major': "CS"}, headers={api.PASSWORD_HEADER: "pw"})
+    assert reply.status_code == 200 and reply.json()['major'] == "CS"
+    reply = client.patch("/users/amy", json={'age': 21, 'password': "changed"}, headers=with_token())
+    assert reply.json()['major'] == "CS" and reply.json()['age'] == 21
+    # the password can't be changed through a profile edit
+    assert client.post("/login", json={'username': "amy", 'password': "pw"}).json() == {'ok': True}
+
+    assert client.patch("/users/ghost", json={'age': 1}, headers=with_token()).status_code == 404
+    assert client.patch("/users/ghost", json={'age': 1}, headers={api.PASSWORD_HEADER: "pw"}).status_code == 401
+
+
+def test_chat_log_uploads(client):
+    log = b"[10/1/24, 1:00 PM] Amy Doe: hey there!\n[10/1/24, 1:01 PM] Bob: hi\n" * 20
+    assert client.post("/chat_logs", content=log).status_code == 401
+    reply = client.post("/chat_logs", content=log, headers=with_token())
+    assert reply.status_code == 201
+    digest = reply.json()['digest']
+
+    assert sign_up(client, profile=dict(PROFILE, chat_log="0" * 64)).status_code == 400
+    assert sign_up(client, profile=dict(PROFILE, chat_log=digest)).status_code == 201
+    assert client.get("/users/amy/style").json()['sample']
+
+    assert client.put("/users/amy/chat_log", content=log + b"more\n").status_code == 401
+    reply = client.put("/users/amy/chat_log", content=log + b"more\n", headers={api.PASSWORD_HEADER: "pw"})
+    assert reply.status_code == 200 and reply.json()['digest'] != digest
+    assert client.get("/users/amy").json()['chat_log'] == reply.json()['digest']
+    assert client.put("/users/ghost/chat_log", content=log, headers=with_token()).status_code == 404
+
+
+def test_reads_need_no_auth(client):
+    sign_up(client)
+    sign_up(client, 'bob', dict(PROFILE, full_name="Bob Roe"))
+    assert client.get("/health").json() == {'ok': True}
+    assert [username for username, _ in client.get("/users/amy/matches").json()['matches']] == ['bob']
+    assert "Amy Doe" in client.get("/users/amy/profile_text").json()['text']
+
+
+def test_search_rejects_bad_pages(client):
+    query = {'price_range': [500, 3000], 'num_bedrooms': [1, 4]}
+    reply = client.post("/apartments/search", json=query)
+    assert reply.status_code == 200 and reply.json()['page'] == 1
+    assert client.post("/apartments/search", json=dict(query, page_size=0)).status_code == 400
+    assert client.post("/apartments/search", json=dict(query, page=0)).status_code == 400
+
+
+def test_support_history_is_bounded(client, model):
+    turn = {'role': 'user', 'parts': [{'text': "My wifi keeps dropping. " * 200}]}
+    reply = {'role': 'model', 'parts': [{'text': "Try restarting the router. " * 200}]}
+    history = [turn, reply] * 200
+    response = client.post("/support/stream", json={'history': history, 'issue': "Still broken?"})
+    assert response.status_code == 200 and response.text
+    # what reached the model is the bounded history plus the issue, not 400 long turns
+    assert model.prompt_sizes[-1] <= (chat_history.MAX_TOKENS + 100) * 4
+
+    assert client.post("/support/stream", json={'history': [], 'issue': "x" * (chat_history.MAX_TOKENS * 4 + 8)}).status_code == 413
+    assert client.post("/support/stream", json={'history': [{'role': 'system', 'parts': [{'text': "hi"}]}], 'issue': "hi"}).status_code == 400
+    assert client.post("/support/stream", json={'history': [{'text': "hi"}], 'issue': "hi"}).status_code == 400
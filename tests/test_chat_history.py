@@ -0,0 +1,43 @@
+import chat_history
+from benchmarks.synthetic import CHAT_PHRASES
+from chat_history import ChatHistory
+from fake_llm import FakeGenerativeModel
+
+
+def talk(history, model, issue):
+    chat = model.start_chat(history=history.to_history())
+    reply = chat.send_message(issue).text
+    history.add("user", issue)
+    history.add("model", reply)
+
+
+def test_stays_under_max_tokens_every_turn():
+    model = FakeGenerativeModel()
+    history = ChatHistory(max_tokens=600, summary_tokens=150)
+    for turn in range(400):
+        issue = f"Issue {turn}: {CHAT_PHRASES[turn % len(CHAT_PHRASES)]}. " * (1 + turn % 7)
+        talk(history, model, issue)
+        assert history.tokens() <= history.max_tokens, turn
+    assert len(history) == 800
+    assert history.summary
+    # what Gemini was sent is the bounded history plus one message
+    assert max(model.prompt_sizes) <= (history.max_tokens + 200) * 4
+
+
+def test_oversized_turn_is_truncated():
+    model = FakeGenerativeModel()
+    history = ChatHistory(max_tokens=600, summary_tokens=150)
+    talk(history, model, "My wifi keeps dropping.")
+    paste = "Where do I reset the router? " + "log line\n" * 5000
+    history.add("user", paste)
+    assert history.tokens() <= history.max_tokens
+
+    role, kept, _ = history.turns[-1]
+    assert kept.startswith("Where do I reset the router?")
+    assert kept.endswith("…")
+    assert chat_history.approx_tokens(kept) <= history.turn_budget
+
+    # the next reply folds the paste into the summary, still under the ceiling
+    history.add("model", model.generate_content(kept).text)
+    assert history.tokens() <= history.max_tokens
+    assert "Where do I reset the router?" in history.summary
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from chat_logs import CHUNK_SIZE, ChatLogStore, UploadTooLarge, iter_chunks
+
+LOG = "[10/1/24, 1:00 PM] Amy: hey 😎\n[10/1/24, 1:01 PM] Bob: hi\n".encode('utf-8')
+
+
+def stored_files(store):
+    return sorted(os.path.relpath(os.path.join(root, name), store.objects_dir) for root, _, names in os.walk(store.objects_dir) for name in names)
+
+
+def test_round_trip(tmp_path):
+    store = ChatLogStore(str(tmp_path))
+    digest = store.put(LOG)
+    assert digest in store
+    assert store.text(digest) == LOG.decode('utf-8')
+    assert stored_files(store) == [os.path.join(digest[:2], f"{digest}.txt")]
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = ChatLogStore(str(tmp_path))
+    # the same bytes as bytes, a file and a chunk iterable
+    path = tmp_path / 'upload.txt'
+    path.write_bytes(LOG * 5000)
+    with open(path, 'rb') as f:
+        digests = {store.put(LOG * 5000), store.put(f), store.put(iter_chunks(LOG * 5000, 1000))}
+    assert len(digests) == 1
+    assert len(stored_files(store)) == 1
+    assert store.put(LOG + b"!") not in digests
+    assert len(stored_files(store)) == 2
+
+
+@pytest.mark.parametrize('size', [CHUNK_SIZE + 1, 3 * CHUNK_SIZE])
+def test_upload_over_the_cap_leaves_nothing_behind(tmp_path, size):
+    store = ChatLogStore(str(tmp_path), max_bytes=CHUNK_SIZE)
+    with pytest.raises(UploadTooLarge):
+        store.put(b"x" * size)
+    assert stored_files(store) == []
+    # exactly the cap is fine
+    assert store.put(b"x" * CHUNK_SIZE) in store
+
+
+def test_endless_upload_is_cut_off(tmp_path):
+    store = ChatLogStore(str(tmp_path), max_bytes=4 * CHUNK_SIZE)
+    pulled = []
+
+    def endless():
+        while True:
+            pulled.append(1)
+            yield b"x" * CHUNK_SIZE
+
+    with pytest.raises(UploadTooLarge):
+        store.put(endless())
+    assert len(pulled) == 5
+    assert stored_files(store) == []
+
+
+@pytest.mark.parametrize('digest', [None, "", "abc", "0" * 63, "G" * 64, "A" * 64, "../" + "0" * 61, "0" * 64 + "\n"])
+def test_malformed_digests_are_rejected(tmp_path, digest):
+    store = ChatLogStore(str(tmp_path))
+    assert digest not in store
+    with pytest.raises(ValueError):
+        store.path(digest)
+    with pytest.raises(ValueError):
+        store.text(digest)
+
+
+def test_unknown_digest(tmp_path):
+    store = ChatLogStore(str(tmp_path))
+    store.put(LOG)
+    assert "0" * 64 not in store
+    with pytest.raises(FileNotFoundError):
+        store.text("0" * 64)
+
+
+def test_text_cache_is_bounded(tmp_path):
+    # room for two of the decoded logs, in characters rather than bytes
+    store = ChatLogStore(str(tmp_path), cache_chars=2 * len(LOG.decode('utf-8') + "0"))
+    digests = [store.put(LOG + str(i).encode()) for i in range(5)]
+    for digest in digests:
+        store.text(digest)
+    assert store.cached_chars <= store.cache_chars
+    assert list(store.cache) == digests[-2:]
+    # evicted logs are read from disk again
+    assert store.text(digests[0]) == (LOG + b"0").decode('utf-8')
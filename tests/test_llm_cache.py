@@ -0,0 +1,82 @@
+import llm_cache
+from fake_llm import FakeGenerativeModel
+from llm_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_memory_hit(tmp_path):
+    cache = ResponseCache(tmp_path / 'responses.sqlite')
+    model = FakeGenerativeModel()
+    first = cache.generate(model, "hello")
+    assert cache.generate(model, "hello") == first
+    assert model.calls == 1
+    assert cache.stats == {'memory_hits': 1, 'disk_hits': 0, 'misses': 1}
+
+
+def test_disk_hit_from_fresh_cache(tmp_path):
+    path = tmp_path / 'responses.sqlite'
+    model = FakeGenerativeModel()
+    text = ResponseCache(path).generate(model, "hello")
+
+    reopened = ResponseCache(path)
+    assert reopened.generate(model, "hello") == text
+    assert model.calls == 1
+    assert reopened.stats == {'memory_hits': 0, 'disk_hits': 1, 'misses': 0}
+    # the disk hit is now in memory too
+    reopened.generate(model, "hello")
+    assert reopened.stats['memory_hits'] == 1
+
+
+def test_lru_eviction_at_max_entries():
+    cache = ResponseCache(path=None, max_entries=2)
+    model = FakeGenerativeModel()
+    for prompt in ["a", "b"]:
+        cache.generate(model, prompt)
+    cache.generate(model, "a")  # "b" is now the least recently used
+    cache.generate(model, "c")
+    assert len(cache.memory) == 2
+    assert cache.get(llm_cache.prompt_key(model.model_name, "b")) is None
+    assert cache.get(llm_cache.prompt_key(model.model_name, "a")) is not None
+    cache.generate(model, "b")
+    assert model.calls == 4
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, 'time', clock)
+    cache = ResponseCache(tmp_path / 'responses.sqlite', ttl=60)
+    model = FakeGenerativeModel()
+    key = llm_cache.prompt_key(model.model_name, "hello")
+    cache.generate(model, "hello")
+
+    clock.now += 59
+    assert key in cache
+    assert cache.generate(model, "hello") and model.calls == 1
+
+    clock.now += 2
+    assert key not in cache
+    assert ResponseCache(tmp_path / 'responses.sqlite', ttl=60).get(key) is None
+    assert cache.clear_expired() == 1
+    cache.generate(model, "hello")
+    assert model.calls == 2
+
+
+def test_stats_counters(tmp_path):
+    path = tmp_path / 'responses.sqlite'
+    cache = ResponseCache(path, max_entries=1)
+    model = FakeGenerativeModel()
+    cache.generate(model, "a")  # miss
+    cache.generate(model, "a")  # memory hit
+    cache.generate(model, "b")  # miss, evicts "a" from memory
+    cache.generate(model, "a")  # disk hit
+    key = llm_cache.prompt_key(model.model_name, "zzz")
+    assert key not in cache  # presence checks don't count
+    assert cache.get(key) is None  # miss
+    assert cache.stats == {'memory_hits': 1, 'disk_hits': 1, 'misses': 3}
@@ -0,0 +1,92 @@
+import pytest
+from google.api_core import exceptions
+
+from fake_llm import FakeGenerativeModel
+from llm import LLMScheduler
+from llm_cache import ResponseCache
+
+
+class FlakyModel(FakeGenerativeModel):
+    """Fails with ``error`` on the first ``failures`` calls."""
+
+    def __init__(self, failures, error=exceptions.ServiceUnavailable("overloaded"), **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.error = error
+
+    def generate_content(self, prompt, stream=False):
+        response = super().generate_content(prompt, stream)
+        if self.calls <= self.failures:
+            raise self.error
+        return response
+
+
+def scheduler(**kwargs):
+    return LLMScheduler(ResponseCache(path=None), backoff=0.0, **kwargs)
+
+
+def test_identical_requests_in_flight_share_one_call():
+    llm = scheduler()
+    model = FakeGenerativeModel(delay=0.2)
+    first = llm.submit(model, "hello")
+    second = llm.submit(model, "hello")
+    assert second is first
+    timings = {}
+    assert ''.join(llm.stream(model, "hello", timings)) == first.result()
+    assert timings['source'] == 'merged'
+    assert model.calls == 1
+    assert llm.stats['merged'] == 2
+
+
+def test_prefetch_then_stream():
+    llm = scheduler()
+    model = FakeGenerativeModel(delay=0.2)
+    llm.prefetch(model, ["hello"])
+    timings = {}
+    text = ''.join(llm.stream(model, "hello", timings))
+    assert timings['source'] == 'merged'
+
+    timings = {}
+    assert ''.join(llm.stream(model, "hello", timings)) == text
+    assert timings['source'] == 'cache'
+    # already cached, so nothing is submitted
+    llm.prefetch(model, ["hello"])
+    assert model.calls == 1
+
+
+def test_transient_failures_are_retried():
+    llm = scheduler(retries=3)
+    model = FlakyModel(failures=2)
+    assert llm.generate(model, "hello") == model.reply("hello")
+    assert llm.stats['retries'] == 2
+
+    timings = {}
+    streamed = FlakyModel(failures=1)
+    assert ''.join(llm.stream(streamed, "other", timings)) == streamed.reply("other")
+    assert timings['source'] == 'model'
+    assert llm.stats['retries'] == 3
+
+
+def test_final_failure_leaves_nothing_in_flight():
+    llm = scheduler(retries=2)
+    model = FlakyModel(failures=100)
+    with pytest.raises(exceptions.ServiceUnavailable):
+        llm.submit(model, "hello").result()
+    assert model.calls == 3
+    assert llm.stats['failures'] == 1
+    assert llm.inflight == {}
+
+    with pytest.raises(exceptions.ServiceUnavailable):
+        list(llm.stream(model, "other", {}))
+    assert llm.inflight == {}
+    assert not llm.cache.memory
+
+
+def test_other_errors_are_not_retried():
+    llm = scheduler(retries=3)
+    model = FlakyModel(failures=100, error=ValueError("invalid API key"))
+    with pytest.raises(ValueError):
+        llm.generate(model, "hello")
+    assert model.calls == 1
+    assert llm.stats['retries'] == 0
+    assert llm.inflight == {}
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+import roommates
+from benchmarks.synthetic import make_users
+from roommates import MatchTable, RoommateMatcher
+
+K = 3
+
+
+def random_profile(rng, i):
+    user_data = make_users(1, seed=int(rng.integers(1 << 30)))['user0']
+    user_data['full_name'] = f"User {i}"
+    return user_data
+
+
+def apply(table, matcher, users, username, user_data, version):
+    """What LeasyService does for one write: patch the matcher when it can, else rebuild it."""
+    created = username not in users
+    if user_data is None:
+        users.pop(username)
+    else:
+        users[username] = user_data
+    if created or username in matcher.positions or user_data is None or not roommates.is_looking(user_data):
+        matcher = matcher.with_user(username, user_data)
+    else:
+        # looking again keeps their sign-up position, which with_user can't
+        matcher = RoommateMatcher(users)
+    table.update_user(username, user_data, matcher, version)
+    return matcher
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_incremental_updates_match_a_rebuild(tmp_path, seed):
+    rng = np.random.default_rng(seed)
+    users = make_users(30, seed)
+    matcher = RoommateMatcher(users)
+    table = MatchTable(tmp_path / 'matches.sqlite', k=K)
+    table.build(matcher, '0')
+
+    for version in range(1, 301):
+        usernames = list(users)
+        action = rng.random()
+        if action < 0.25:
+            username, user_data = f"new{version}", random_profile(rng, version)
+        elif action < 0.5:
+            username = usernames[rng.integers(len(usernames))]
+            user_data = dict(users[username], looking_for_roommate="No" if roommates.is_looking(users[username]) else "Yes")
+        elif action < 0.9:
+            username = usernames[rng.integers(len(usernames))]
+            fresh = random_profile(rng, version)
+            field = rng.choice(['smoking_habits', 'has_pet', 'school_year', 'sleeping_habits', 'guest_preferences', 'roommate_year', 'night_person', 'gatherings'])
+            user_data = dict(users[username], **{field: fresh.get(field)})
+        else:
+            username, user_data = usernames[rng.integers(len(usernames))], None
+        matcher = apply(table, matcher, users, username, user_data, str(version))
+        assert table.verify(RoommateMatcher(users)) == [], (version, username)
+        assert table.version == str(version)
+
+
+def test_reload_from_disk(tmp_path):
+    users = make_users(40, seed=3)
+    table = MatchTable(tmp_path / 'matches.sqlite', k=K)
+    table.build(RoommateMatcher(users), 'v1')
+    reopened = MatchTable(tmp_path / 'matches.sqlite', k=K)
+    assert reopened.version == 'v1'
+    assert reopened.verify(RoommateMatcher(users)) == []
+    # a table built for another k is treated as empty
+    assert MatchTable(tmp_path / 'matches.sqlite', k=K + 1).version is None
+
+
+def test_refresh_picks_up_another_process(tmp_path):
+    rng = np.random.default_rng(4)
+    path = tmp_path / 'matches.sqlite'
+    users = make_users(30, seed=4)
+    matcher = RoommateMatcher(users)
+    first = MatchTable(path, k=K)
+    first.build(matcher, '0')
+    second = MatchTable(path, k=K)
+    assert second.matches == first.matches
+
+    for version in range(1, 41):
+        # the two tables take turns writing, each catching up first
+        writer, reader = (first, second) if version % 2 else (second, first)
+        writer.refresh()
+        matcher = apply(writer, matcher, users, f"new{version}", random_profile(rng, version), str(version))
+        reader.refresh()
+        assert reader.version == str(version)
+        assert reader.matches == writer.matches
+        assert reader.verify(RoommateMatcher(users)) == []
+
+    # a rebuild starts a new generation, which the other table reloads whole
+    del users['user0']
+    first.build(RoommateMatcher(users), 'rebuilt')
+    second.refresh()
+    assert second.version == 'rebuilt'
+    assert second.matches == first.matches
+    assert 'user0' not in second.owners or not second.owners['user0']
+
+
+@pytest.mark.parametrize('n, seed', [(1, 0), (2, 1), (25, 2), (200, 3)])
+def test_matcher_agrees_with_loop(n, seed):
+    users = make_users(n, seed)
+    # a user who isn't looking still gets matches, and some profiles miss fields
+    users['loner'] = dict(users['user0'], looking_for_roommate="No")
+    users['sparse'] = {'looking_for_roommate': "Yes", 'school_year': "Junior"}
+    matcher = RoommateMatcher(users)
+    for username in users:
+        expected = roommates.match_users_loop(users, username)
+        assert matcher.top_matches(username, users[username]) == expected, username
+        for k in (1, 3, 10):
+            assert matcher.top_matches(username, users[username], k) == expected[:k], (username, k)
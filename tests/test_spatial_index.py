@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from apartments import EARTH_RADIUS_M, SpatialIndex, haversine_m
+
+
+def random_points(rng, n, missing=0.1):
+    lat = 47.66 + rng.normal(0, 0.03, n)
+    lon = -122.31 + rng.normal(0, 0.03, n)
+    lat[rng.random(n) < missing] = np.nan
+    lon[rng.random(n) < missing] = np.nan
+    return lat, lon
+
+
+def box_mask(lat, lon, south, west, north, east):
+    with np.errstate(invalid='ignore'):
+        return (lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)
+
+
+def restrict(mask, rows):
+    expected = np.flatnonzero(mask)
+    return expected[np.isin(expected, rows)]
+
+
+@pytest.mark.parametrize('n, seed, cell_deg', [(0, 0, 0.01), (1, 1, 0.01), (300, 2, 0.01), (2000, 3, 0.002), (2000, 4, 1.0)])
+def test_bbox_rows_match_brute_force(n, seed, cell_deg):
+    rng = np.random.default_rng(seed)
+    lat, lon = random_points(rng, n)
+    index = SpatialIndex(lat, lon, cell_deg)
+    boxes = [(47.0, -123.0, 48.0, -121.0), (50.0, -100.0, 51.0, -99.0), (47.7, -122.3, 47.6, -122.2)]
+    for _ in range(100):
+        south, north = np.sort(47.66 + rng.normal(0, 0.05, 2))
+        west, east = np.sort(-122.31 + rng.normal(0, 0.05, 2))
+        boxes.append((south, west, north, east))
+    if n:
+        # a box whose edges pass exactly through listings
+        finite = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))[:2]
+        boxes.append((lat[finite].min(), lon[finite].min(), lat[finite].max(), lon[finite].max()))
+    subset = rng.choice(n, n // 3, replace=False) if n else np.empty(0, dtype=np.intp)
+    for box in boxes:
+        mask = box_mask(lat, lon, *box)
+        assert np.array_equal(index.bbox_rows(*box), np.flatnonzero(mask)), box
+        assert np.array_equal(index.bbox_rows(*box, rows=subset), restrict(mask, subset)), box
+
+
+@pytest.mark.parametrize('n, seed, cell_deg', [(0, 0, 0.01), (300, 5, 0.01), (2000, 6, 0.002), (2000, 7, 1.0)])
+def test_radius_rows_match_brute_force(n, seed, cell_deg):
+    rng = np.random.default_rng(seed)
+    lat, lon = random_points(rng, n)
+    index = SpatialIndex(lat, lon, cell_deg)
+    subset = rng.choice(n, n // 3, replace=False) if n else np.empty(0, dtype=np.intp)
+    for _ in range(100):
+        centre_lat, centre_lon = 47.66 + rng.normal(0, 0.03), -122.31 + rng.normal(0, 0.03)
+        radius = float(rng.choice([10.0, 500.0, 2_000.0, 20_000.0]))
+        with np.errstate(invalid='ignore'):
+            mask = haversine_m(centre_lat, centre_lon, lat, lon) <= radius
+        assert np.array_equal(index.radius_rows(centre_lat, centre_lon, radius), np.flatnonzero(mask))
+        assert np.array_equal(index.radius_rows(centre_lat, centre_lon, radius, rows=subset), restrict(mask, subset))
+
+
+@pytest.mark.parametrize('centre_lat', [0.0, 47.66, 80.0])
+def test_radius_reaches_the_circles_widest_point(centre_lat):
+    # the circle is widest off the centre's latitude, a little past radius / cos(lat) degrees of longitude
+    radius = 50_000.0
+    d = radius / EARTH_RADIUS_M
+    widest_lat = np.degrees(np.arcsin(np.sin(np.radians(centre_lat)) / np.cos(d)))
+    widest_lon = np.degrees(np.arcsin(np.sin(d) / np.cos(np.radians(centre_lat))))
+    lat = np.array([widest_lat, widest_lat, centre_lat])
+    lon = np.array([widest_lon * 0.999999, widest_lon * 1.0001, 0.0])
+    index = SpatialIndex(lat, lon)
+    assert index.radius_rows(centre_lat, 0.0, radius).tolist() == [0, 2]
@@ -0,0 +1,72 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from user_store import JsonUserStore, SqliteUserStore
+
+UPDATES = 100
+
+
+@pytest.fixture(params=['sqlite', 'json'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        return SqliteUserStore(str(tmp_path / 'users.sqlite'))
+    return JsonUserStore(str(tmp_path / 'users.json'))
+
+
+def test_update_merges_in_one_step(store):
+    store.upsert('amy', {'name': "Amy", 'looking_for_roommate': "No"})
+    seen = []
+    user_data = store.update('amy', lambda user_data: user_data.update(looking_for_roommate="Yes"), lambda before, after: seen.append((before, after)))
+    assert user_data == {'name': "Amy", 'looking_for_roommate': "Yes"}
+    assert store['amy'] == user_data
+    assert len(seen) == 1 and seen[0][1] == store.version()
+    assert list(store.find(looking_for_roommate="Yes")) == ['amy']
+
+
+def test_update_of_missing_user_writes_nothing(store):
+    store.upsert('amy', {'name': "Amy"})
+    version = store.version()
+    assert store.update('bob', lambda user_data: user_data.update(name="Bob")) is None
+    assert store.version() == version
+    assert 'bob' not in store
+
+
+def count_up(path, field):
+    store = SqliteUserStore(path)
+    for i in range(UPDATES):
+        store.update('amy', lambda user_data: user_data.update({field: i, 'count': user_data.get('count', 0) + 1}))
+
+
+def test_concurrent_updates_from_processes_keep_every_field(tmp_path):
+    path = str(tmp_path / 'users.sqlite')
+    SqliteUserStore(path).upsert('amy', {'name': "Amy"})
+    # separate processes, as with several API workers; threads rarely interleave enough to show a lost update
+    workers = [multiprocessing.Process(target=count_up, args=(path, f"field{n}")) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert [worker.exitcode for worker in workers] == [0] * 4
+    user_data = SqliteUserStore(path)['amy']
+    assert user_data['count'] == 4 * UPDATES
+    assert all(user_data[f"field{n}"] == UPDATES - 1 for n in range(4))
+
+
+def test_concurrent_json_updates_keep_every_field(tmp_path):
+    store = JsonUserStore(str(tmp_path / 'users.json'))
+    store.upsert('amy', {'name': "Amy"})
+
+    def writer(field):
+        for i in range(UPDATES):
+            store.update('amy', lambda user_data: user_data.update({field: i, 'count': user_data.get('count', 0) + 1}))
+
+    threads = [threading.Thread(target=writer, args=(f"field{n}",)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    user_data = store['amy']
+    assert user_data['count'] == 4 * UPDATES
+    assert all(user_data[f"field{n}"] == UPDATES - 1 for n in range(4))
@@ -0,0 +1,264 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from collections.abc import MutableMapping
+
+USERS_DB = 'users.sqlite'
+
+# profile fields that get their own indexed column for secondary lookups
+INDEXED_FIELDS = ['looking_for_roommate', 'school_year']
+
+
+class SqliteUserStore(MutableMapping):
+    """User profiles in SQLite (WAL mode), one row per username.
+
+    Behaves like the ``users`` dict the app used to load from users.json, but
+    reads and writes touch a single row. Every thread gets its own connection
+    so readers never block each other, and each upsert is its own transaction.
+    """
+
+    def __init__(self, path=USERS_DB):
+        self.path = path
+        self.local = threading.local()
+        with self.connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "username TEXT PRIMARY KEY, looking_for_roommate TEXT, school_year TEXT, data TEXT NOT NULL)"
+            )
+            for field in INDEXED_FIELDS:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS users_{field} ON users ({field})")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)", (uuid.uuid4().hex,))
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('changes', '0')")
+
+    def connect(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def version(self):
+        # changes whenever any process writes a profile
+        rows = dict(self.connect().execute("SELECT key, value FROM meta WHERE key IN ('instance', 'changes')"))
+        return f"{rows['instance']}:{rows['changes']}"
+
+    def row(self, username, user_data):
+        return (username, *(user_data.get(field) for field in INDEXED_FIELDS), json.dumps(user_data))
+
+    def bump(self, conn):
+        # inside the writing transaction, so no other process can change
+        # anything between the two versions returned
+        rows = dict(conn.execute("SELECT key, value FROM meta WHERE key IN ('instance', 'changes')"))
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'changes'")
+        changes = int(rows['changes'])
+        return f"{rows['instance']}:{changes}", f"{rows['instance']}:{changes + 1}"
+
+    def upsert_many(self, items, on_write=None):
+        """Insert or replace profiles; returns the store version before and after the write.
+
+        ``on_write(before, after)`` runs before the transaction commits, so
+        other processes neither see the write nor make their own until it
+        returns.
+        """
+        # ON CONFLICT keeps the rowid, so users stay in sign-up order like the old dict
+        with self.connect() as conn:
+            conn.executemany(
+                "INSERT INTO users (username, looking_for_roommate, school_year, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (username) DO UPDATE SET looking_for_roommate = excluded.looking_for_roommate, "
+                "school_year = excluded.school_year, data = excluded.data",
+                (self.row(username, user_data) for username, user_data in items),
+            )
+            before, after = self.bump(conn)
+            if on_write is not None:
+                on_write(before, after)
+            return before, after
+
+    def upsert(self, username, user_data, on_write=None):
+        return self.upsert_many([(username, user_data)], on_write)
+
+    def insert(self, username, user_data, on_write=None):
+        """Add a new profile like upsert; returns None, writing nothing, if ``username`` is taken."""
+        with self.connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO users (username, looking_for_roommate, school_year, data) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (username) DO NOTHING",
+                self.row(username, user_data),
+            )
+            if cursor.rowcount == 0:
+                return None
+            before, after = self.bump(conn)
+            if on_write is not None:
+                on_write(before, after)
+            return before, after
+
+    def update(self, username, change, on_write=None):
+        """Read, ``change(user_data)`` and write back a profile in one transaction.
+
+        Returns the changed profile, or None, writing nothing, if there is no
+        such user. BEGIN IMMEDIATE takes the write lock before the read, so
+        concurrent updates from other processes can't drop each other's fields.
+        """
+        with self.connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+            if row is None:
+                return None
+            user_data = json.loads(row[0])
+            change(user_data)
+            conn.execute(
+                "UPDATE users SET looking_for_roommate = ?, school_year = ?, data = ? WHERE username = ?",
+                (*self.row(username, user_data)[1:], username),
+            )
+            before, after = self.bump(conn)
+            if on_write is not None:
+                on_write(before, after)
+            return user_data
+
+    def get(self, username, default=None):
+        row = self.connect().execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def find(self, **criteria):
+        """Profiles whose indexed fields equal ``criteria``, e.g. find(school_year="Junior")."""
+        unknown = set(criteria) - set(INDEXED_FIELDS)
+        if unknown:
+            raise KeyError(f"not an indexed field: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f"{field} = ?" for field in criteria) or "1"
+        rows = self.connect().execute(f"SELECT username, data FROM users WHERE {where} ORDER BY rowid", tuple(criteria.values()))
+        return {username: json.loads(data) for username, data in rows}
+
+    def __getitem__(self, username):
+        user_data = self.get(username)
+        if user_data is None:
+            raise KeyError(username)
+        return user_data
+
+    def __setitem__(self, username, user_data):
+        self.upsert(username, user_data)
+
+    def __delitem__(self, username):
+        with self.connect() as conn:
+            if conn.execute("DELETE FROM users WHERE username = ?", (username,)).rowcount == 0:
+                raise KeyError(username)
+            self.bump(conn)
+
+    def __contains__(self, username):
+        return self.connect().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def __iter__(self):
+        for (username,) in self.connect().execute("SELECT username FROM users ORDER BY rowid"):
+            yield username
+
+    def __len__(self):
+        return self.connect().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def items(self):
+        return self.find().items()
+
+
+class JsonUserStore(MutableMapping):
+    """The original users.json layout behind the same interface.
+
+    Every write still rewrites the whole file, but through a temp file and
+    rename so a crash or a concurrent reader never sees half a file.
+    """
+
+    def __init__(self, path='users.json'):
+        self.path = path
+        # reentrant so insert and update can read and write under one hold
+        self.lock = threading.RLock()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def version(self):
+        if not os.path.exists(self.path):
+            return None
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def write(self, users):
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(users, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def upsert_many(self, items, on_write=None):
+        with self.lock:
+            before = self.version()
+            users = self.load()
+            users.update(items)
+            self.write(users)
+            after = self.version()
+            if on_write is not None:
+                on_write(before, after)
+            return before, after
+
+    def upsert(self, username, user_data, on_write=None):
+        return self.upsert_many([(username, user_data)], on_write)
+
+    def insert(self, username, user_data, on_write=None):
+        with self.lock:
+            if username in self.load():
+                return None
+            return self.upsert(username, user_data, on_write)
+
+    def update(self, username, change, on_write=None):
+        with self.lock:
+            user_data = self.load().get(username)
+            if user_data is None:
+                return None
+            change(user_data)
+            self.upsert(username, user_data, on_write)
+            return user_data
+
+    def find(self, **criteria):
+        return {
+            username: user_data for username, user_data in self.load().items()
+            if all(user_data.get(field) == value for field, value in criteria.items())
+        }
+
+    def __getitem__(self, username):
+        return self.load()[username]
+
+    def __setitem__(self, username, user_data):
+        self.upsert(username, user_data)
+
+    def __delitem__(self, username):
+        with self.lock:
+            users = self.load()
+            del users[username]
+            self.write(users)
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def items(self):
+        return self.load().items()
+
+
+def open_user_store(path=USERS_DB):
+    if path.endswith('.json'):
+        return JsonUserStore(path)
+    return SqliteUserStore(path)
+
+
+def migrate_json(json_path, store):
+    """One-shot copy of users.json into ``store``; returns the number of profiles copied."""
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, 'r') as f:
+        users = json.load(f)
+    store.upsert_many(users.items())
+    return len(users)